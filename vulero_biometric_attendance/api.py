@@ -1,30 +1,60 @@
 from __future__ import annotations
 
+import hashlib
 import json
-from typing import Any, Dict
+from collections import defaultdict
+from typing import Any, Dict, List
 
 import frappe
 from frappe import _
-from frappe.utils import now_datetime
+from frappe.model.document import Document
+from frappe.utils import add_to_date, cint, convert_utc_to_system_timezone, get_datetime, now_datetime
 from frappe.utils.file_manager import save_file
 
 from hrms.hr.doctype.shift_assignment.shift_assignment import get_actual_start_end_datetime_of_shift
 
 from vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_attendance_settings.biometric_attendance_settings import (
+    BiometricAttendanceSettings,
     get_settings,
 )
+from vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_checkin_attempt.biometric_checkin_attempt import (
+    CheckinAttempt,
+)
 from vulero_biometric_attendance.vulero_biometric_attendance.doctype.employee_biometric_profile.employee_biometric_profile import (
     EmployeeBiometricProfile,
 )
 from vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric import (
+    ENROLLMENT_IMAGE_SIZE,
+    ENROLLMENT_THUMBNAIL_SIZE,
+    EncodingCandidate,
+    EncodingGallery,
     assert_allowed_network,
+    build_encoding_gallery,
     decode_image,
+    decode_image_safely,
+    downscale_image,
     encode_image,
-    invalidate_encoding_cache,
+    encode_images,
+    get_request_ip,
     load_encoding_cache,
-    match_encoding,
+    load_scoped_encodings,
+    match_encodings_batch,
+    rank_encoding,
+    try_encode_image,
 )
 
+CHECK_IN_STATUS_EVENT = "biometric_check_in_status"
+BATCH_RESULT_CACHE_KEY = "vulero_biometric_attendance:checkin_batch_result"
+BATCH_RESULT_TTL = 7 * 24 * 60 * 60
+# Held while a capture is being ingested, so a concurrent resubmission cannot record it twice.
+BATCH_RESERVATION_KEY = "vulero_biometric_attendance:checkin_batch_reservation"
+BATCH_RESERVATION_TTL = 10 * 60
+# Kiosk clocks drift; captures stamped slightly ahead of the server are still accepted.
+BATCH_CLOCK_SKEW_MINUTES = 5
+# Progress of a burst whose frames arrive in separate requests.
+BURST_STATE_CACHE_KEY = "vulero_biometric_attendance:checkin_burst_state"
+BURST_STATE_TTL = 60
+
 
 def _resolve_employee(target_employee: str | None = None) -> str:
 	if target_employee:
@@ -60,19 +90,36 @@ def _get_or_create_profile(employee: str) -> EmployeeBiometricProfile:
 	return profile
 
 
-def _save_capture_file(file_bytes: bytes, profile: EmployeeBiometricProfile) -> str:
-	filename = f"biometric-{profile.employee}-{now_datetime().strftime('%Y%m%d%H%M%S')}.jpg"
+def _save_capture_file(file_bytes: bytes, employee: str, profile: str, suffix: str = "") -> str:
+	filename = f"biometric-{employee}-{now_datetime().strftime('%Y%m%d%H%M%S')}{suffix}.jpg"
 	file_doc = save_file(
 		filename,
 		file_bytes,
-		doctype=profile.doctype,
-		name=profile.name,
+		doctype="Employee Biometric Profile",
+		name=profile,
 		is_private=1,
 		decode=False,
 	)
 	return file_doc.file_url
 
 
+def persist_enrollment_images(profile: str, sample: str, image: bytes, thumbnail: bytes) -> None:
+	"""Background job: store a deferred enrollment capture and link it to its sample."""
+	if not frappe.db.exists("Employee Biometric Sample", sample):
+		return
+
+	employee = frappe.db.get_value("Employee Biometric Profile", profile, "employee")
+	frappe.db.set_value(
+		"Employee Biometric Sample",
+		sample,
+		{
+			"image": _save_capture_file(image, employee, profile),
+			"thumbnail": _save_capture_file(thumbnail, employee, profile, "-thumb"),
+		},
+		update_modified=False,
+	)
+
+
 @frappe.whitelist()
 def enroll_face_sample(
 	image: str,
@@ -92,7 +139,14 @@ def enroll_face_sample(
 	if any(row.encoding_checksum == checksum for row in profile.biometric_samples or []):
 		frappe.throw(_("This biometric sample is already registered. Capture a different image."))
 
-	image_url = _save_capture_file(file_bytes, profile)
+	defer_images = cint(get_settings().defer_enrollment_images)
+	if defer_images:
+		# Only the small copies travel through the job queue.
+		deferred_image = downscale_image(file_bytes, ENROLLMENT_IMAGE_SIZE)
+		deferred_thumbnail = downscale_image(file_bytes, ENROLLMENT_THUMBNAIL_SIZE, quality=75)
+		image_url = None
+	else:
+		image_url = _save_capture_file(file_bytes, profile.employee, profile.name)
 
 	child = profile.append(
 		"biometric_samples",
@@ -112,8 +166,17 @@ def enroll_face_sample(
 		profile.status = "Pending Approval"
 
 	profile.save()
-	if profile.status == "Approved":
-		invalidate_encoding_cache()
+
+	if defer_images:
+		frappe.enqueue(
+			"vulero_biometric_attendance.api.persist_enrollment_images",
+			queue="short",
+			enqueue_after_commit=True,
+			profile=profile.name,
+			sample=child.name,
+			image=deferred_image,
+			thumbnail=deferred_thumbnail,
+		)
 
 	return {
 		"profile": profile.name,
@@ -121,6 +184,7 @@ def enroll_face_sample(
 		"sample": child.sample_name,
 		"status": profile.status,
 		"image_url": image_url,
+		"image_pending": bool(defer_images),
 	}
 
 
@@ -131,60 +195,633 @@ def check_in_with_face(
 	longitude: float | None = None,
 	device_id: str | None = None,
 ) -> Dict[str, Any]:
-	from hrms.hr.doctype.employee_checkin.employee_checkin import EmployeeCheckin
+	attempt = CheckinAttempt("check_in_with_face", device_id, get_request_ip())
+	try:
+		with attempt.stage("network"):
+			network = assert_allowed_network()
+
+		settings = get_settings()
+		if not settings.enabled:
+			frappe.throw(_("Biometric attendance is currently disabled."))
+
+		with attempt.stage("decode"):
+			file_bytes = decode_image(image)
+		with attempt.stage("encode"):
+			source_encoding, checksum = encode_image(file_bytes)
+
+		with attempt.stage("match"):
+			candidate, distance, ranked = _match_face(source_encoding, settings, device_id, network)
+		if not candidate:
+			message = _("Face not recognized. Please try again or contact HR.")
+			attempt.record_no_match(ranked, settings.confidence_threshold or 0.55, message)
+			frappe.throw(message)
+
+		with attempt.stage("checkin"):
+			result = _record_face_checkin(candidate, distance, checksum, device_id, latitude, longitude)
+	except frappe.ValidationError as exc:
+		attempt.record_failure(exc)
+		raise
+
+	attempt.record_match(candidate, distance, ranked)
+	return result
 
-	assert_allowed_network()
 
+@frappe.whitelist()
+def check_in_with_face_burst(
+	frames: str | List[str],
+	latitude: float | None = None,
+	longitude: float | None = None,
+	device_id: str | None = None,
+	burst_id: str | None = None,
+	final: int = 1,
+) -> Dict[str, Any]:
+	"""Check in from a short burst of low-resolution frames.
+
+	Frames are encoded one at a time and processing stops at the first frame whose
+	distance is clearly under the threshold, so the remaining frames are never encoded.
+	Without such a frame the closest match under the threshold across the burst is used.
+
+	The check-in page sends one frame per request under a common ``burst_id``: until
+	the ``final`` frame, a request without a clear match only returns ``pending`` and
+	the burst's progress is kept in Redis for the next frame. Only the request that
+	ends the burst is written to the attempt log.
+	"""
+	attempt = CheckinAttempt("check_in_with_face_burst", device_id, get_request_ip())
+	try:
+		with attempt.stage("network"):
+			network = assert_allowed_network()
+		result = _check_in_with_burst(
+			attempt, frames, network, latitude, longitude, device_id, burst_id, cint(final)
+		)
+	except frappe.ValidationError as exc:
+		attempt.record_failure(exc)
+		raise
+
+	return result
+
+
+def _check_in_with_burst(
+	attempt: CheckinAttempt,
+	frames: str | List[str],
+	network: Document | None,
+	latitude: float | None,
+	longitude: float | None,
+	device_id: str | None,
+	burst_id: str | None = None,
+	final: int = 1,
+) -> Dict[str, Any]:
 	settings = get_settings()
 	if not settings.enabled:
 		frappe.throw(_("Biometric attendance is currently disabled."))
 
-	file_bytes = decode_image(image)
-	source_encoding, checksum = encode_image(file_bytes)
+	frames = _parse_burst_frames(frames)
+	if not frames:
+		frappe.throw(_("No image data provided."))
 
-	candidates = load_encoding_cache()
-	if not candidates:
-		frappe.throw(_("No approved biometric profiles found. Contact your HR administrator."))
+	final = final or not burst_id
+	cache = frappe.cache()
+	state_key = f"{BURST_STATE_CACHE_KEY}:{frappe.session.user}:{burst_id}" if burst_id else None
+	state = (state_key and cache.get_value(state_key, expires=True)) or frappe._dict(
+		best=None, nearest={}, frame_error=None, frames_processed=0, attempted=False
+	)
+	max_frames = cint(settings.max_burst_frames) or 8
+	if state.frames_processed + len(frames) > max_frames:
+		frappe.throw(_("A burst may contain at most {0} frames.").format(max_frames))
 
 	threshold = settings.confidence_threshold or 0.55
-	candidate, distance = match_encoding(source_encoding, candidates, threshold)
-	if not candidate:
-		frappe.throw(_("Face not recognized. Please try again or contact HR."))
-
+	confident_distance = threshold - (settings.burst_confidence_margin or 0)
+	limit = cint(settings.max_match_count) or 3
+	galleries = _FaceGalleries(settings, device_id, network)
+
+	# best is (candidate, distance, checksum); nearest keeps the closest distance per
+	# sample across all frames, for the attempt log.
+	for frame in frames:
+		state.frames_processed += 1
+		with attempt.stage("encode"):
+			encoding = try_encode_image(decode_image_safely(frame))
+		if isinstance(encoding, str):
+			state.frame_error = encoding
+			continue
+
+		source_encoding, checksum = encoding
+		with attempt.stage("match"):
+			candidate, distance, ranked = galleries.match(source_encoding, threshold, limit)
+		state.attempted = True
+		for ranked_candidate, ranked_distance in ranked:
+			key = (ranked_candidate.profile, ranked_candidate.sample)
+			if key not in state.nearest or ranked_distance < state.nearest[key][1]:
+				state.nearest[key] = (ranked_candidate, ranked_distance)
+		if candidate and (state.best is None or distance < state.best[1]):
+			state.best = (candidate, distance, checksum)
+		if state.best and state.best[1] <= confident_distance:
+			break
+
+	best = state.best
+	if not final and not (best and best[1] <= confident_distance):
+		cache.set_value(state_key, state, expires_in_sec=BURST_STATE_TTL)
+		return {"pending": True, "frames_processed": state.frames_processed}
+	if state_key:
+		cache.delete_value(state_key)
+
+	closest = sorted(state.nearest.values(), key=lambda entry: entry[1])[:limit]
+	if not best:
+		if not state.attempted:
+			message = state.frame_error or _("No face detected in the captured image. Please try again.")
+			attempt.record("No Face", message=message)
+			frappe.throw(message)
+		if galleries.is_empty():
+			frappe.throw(_("No approved biometric profiles found. Contact your HR administrator."))
+		message = _("Face not recognized. Please try again or contact HR.")
+		attempt.record_no_match(closest, threshold, message)
+		frappe.throw(message)
+
+	candidate, distance, checksum = best
+	with attempt.stage("checkin"):
+		result = _record_face_checkin(candidate, distance, checksum, device_id, latitude, longitude)
+	attempt.record_match(candidate, distance, closest)
+	result["frames_processed"] = state.frames_processed
+	return result
+
+
+def _parse_burst_frames(frames: str | List[str] | None) -> List[str]:
+	"""Accept a list of frames, its JSON form, or a single bare data URL / base64 string."""
+	if isinstance(frames, str):
+		if not frames.lstrip().startswith("["):
+			return [frames] if frames.strip() else []
+		frames = frappe.parse_json(frames)
+	return [frame for frame in frames or [] if frame]
+
+
+class _FaceGalleries:
+	"""Partition-then-global galleries for matching several probes from one kiosk.
+
+	Each gallery is stacked once and reused for every frame; the global one is only
+	loaded when a frame misses the local partition and fallback is enabled.
+	"""
+
+	def __init__(
+		self,
+		settings: BiometricAttendanceSettings,
+		device_id: str | None = None,
+		network: Document | None = None,
+	) -> None:
+		self.scope = settings.get_gallery_scope(device_id, network)
+		self.fallback = cint(settings.fallback_to_global_gallery)
+		self._local: EncodingGallery | None = None
+		self._global: EncodingGallery | None = None
+
+	def match(
+		self, source_encoding: list[float], threshold: float, limit: int = 3
+	) -> tuple[EncodingCandidate | None, float | None, list[tuple[EncodingCandidate, float]]]:
+		"""Return ``(candidate, distance, ranked)`` for one frame, as ``_match_face`` does."""
+		if self.scope != (None, None):
+			ranked = rank_encoding(source_encoding, self._get_local(), limit)
+			if ranked and ranked[0][1] <= threshold:
+				return ranked[0][0], ranked[0][1], ranked
+			if not self.fallback:
+				return None, None, ranked
+		ranked = rank_encoding(source_encoding, self._get_global(), limit)
+		if ranked and ranked[0][1] <= threshold:
+			return ranked[0][0], ranked[0][1], ranked
+		return None, None, ranked
+
+	def is_empty(self) -> bool:
+		return not len(self._get_global())
+
+	def _get_local(self) -> EncodingGallery:
+		if self._local is None:
+			self._local = build_encoding_gallery(load_scoped_encodings(*self.scope))
+		return self._local
+
+	def _get_global(self) -> EncodingGallery:
+		if self._global is None:
+			self._global = build_encoding_gallery(load_encoding_cache())
+		return self._global
+
+
+def _record_face_checkin(
+	candidate: EncodingCandidate,
+	distance: float,
+	checksum: str,
+	device_id: str | None = None,
+	latitude: float | None = None,
+	longitude: float | None = None,
+) -> Dict[str, Any]:
 	employee = candidate.employee
 	log_type = _determine_log_type(employee)
 
+	doc = _create_checkin(employee, log_type, now_datetime(), device_id, latitude, longitude)
+	_mark_profile_verified(candidate.profile, doc.time)
+
+	return {
+		"employee": employee,
+		"profile": candidate.profile,
+		"sample": candidate.sample,
+		"log_type": log_type,
+		"time": doc.time,
+		"checkin": doc.name,
+		"distance": distance,
+		"encoding_checksum": checksum,
+	}
+
+
+@frappe.whitelist()
+def check_in_batch(items: str | List[Dict[str, Any]], device_id: str | None = None) -> List[Dict[str, Any]]:
+	"""Ingest captures a kiosk buffered while it was offline.
+
+	Each item carries ``image`` and ``captured_at`` and optionally ``capture_id``,
+	``device_id``, ``latitude`` and ``longitude``. Only devices listed under Kiosk Devices
+	may upload, and captures older than Max Capture Age are refused. Results come back
+	per item in input order with a ``status`` of ``ok``, ``duplicate`` (already ingested
+	by an earlier submission) or ``error``. A capture that another submission is still
+	ingesting, or that would break the IN/OUT order of check-ins recorded after it, is
+	an ``error``.
+	"""
+	network = assert_allowed_network()
+
+	settings = get_settings()
+	if not settings.enabled:
+		frappe.throw(_("Biometric attendance is currently disabled."))
+
+	items = frappe.parse_json(items) or []
+	if not isinstance(items, list):
+		frappe.throw(_("Check-in batch must be a list of captures."))
+	max_batch_size = cint(settings.max_batch_size) or 50
+	if len(items) > max_batch_size:
+		frappe.throw(_("A batch may contain at most {0} captures.").format(max_batch_size))
+
+	results: List[Dict[str, Any] | None] = [None] * len(items)
+	pending: List[frappe._dict] = []
+	now = now_datetime()
+	latest_allowed = add_to_date(now, minutes=BATCH_CLOCK_SKEW_MINUTES)
+	max_age_hours = cint(settings.max_capture_age_hours) or 24
+	earliest_allowed = add_to_date(now, hours=-max_age_hours)
+	cache = frappe.cache()
+	reserved: List[str] = []
+
+	for index, raw_item in enumerate(items):
+		item = _parse_batch_item(index, raw_item, device_id)
+		if item.error:
+			results[index] = _batch_result(item, "error", message=item.error)
+		elif not settings.is_registered_device(item.device_id):
+			results[index] = _batch_result(
+				item,
+				"error",
+				message=_("Device {0} is not registered in Biometric Attendance Settings.").format(
+					item.device_id or _("(none)")
+				),
+			)
+		elif item.time > latest_allowed:
+			results[index] = _batch_result(item, "error", message=_("Capture time is in the future."))
+		elif item.time < earliest_allowed:
+			results[index] = _batch_result(
+				item, "error", message=_("Capture is older than {0} hours.").format(max_age_hours)
+			)
+		elif not _reserve_batch_item(item.key):
+			results[index] = _batch_result(
+				item, "error", message=_("This capture is already being processed. Retry later.")
+			)
+		else:
+			reserved.append(item.key)
+			# Read past the request-local cache: an earlier submission may have just finished.
+			if cached := cache.get_value(f"{BATCH_RESULT_CACHE_KEY}:{item.key}", expires=True):
+				results[index] = _batch_result(item, "duplicate", **cached)
+			else:
+				pending.append(item)
+	frappe.db.after_rollback.add(lambda: _release_batch_items(reserved))
+
+	encoded = encode_images([item.image_bytes for item in pending], cint(settings.batch_encode_workers) or 4)
+	recognizable: List[frappe._dict] = []
+	for item, encoding in zip(pending, encoded, strict=True):
+		if isinstance(encoding, str):
+			results[item.index] = _batch_result(item, "error", message=encoding)
+			continue
+		item.encoding, item.checksum = encoding
+		recognizable.append(item)
+
+	matches = _match_faces_batch(
+		[item.encoding for item in recognizable],
+		[item.device_id for item in recognizable],
+		settings,
+		network,
+	)
+	matched: List[frappe._dict] = []
+	for item, (candidate, distance) in zip(recognizable, matches, strict=True):
+		if not candidate:
+			results[item.index] = _batch_result(
+				item, "error", message=_("Face not recognized. Please try again or contact HR.")
+			)
+			continue
+		item.candidate, item.distance = candidate, distance
+		matched.append(item)
+
+	_assign_batch_log_types(matched)
+
+	verified_on: Dict[str, Any] = {}
+	for item in sorted(matched, key=lambda item: (item.time, item.index)):
+		if item.duplicate_of is not None:
+			continue
+		if item.existing_checkin:
+			results[item.index] = _batch_match_result(item, "duplicate", item.existing_checkin)
+			continue
+		if item.conflict:
+			results[item.index] = _batch_result(
+				item,
+				"error",
+				message=_(
+					"Capture conflicts with check-in {0} recorded later at {1}. Add it to the attendance manually."
+				).format(item.conflict.name, item.conflict.time),
+			)
+			continue
+
+		save_point = f"checkin_batch_{item.index}"
+		frappe.db.savepoint(save_point)
+		try:
+			doc = _create_checkin(
+				item.candidate.employee, item.log_type, item.time, item.device_id, item.latitude, item.longitude
+			)
+		except frappe.ValidationError as exc:
+			frappe.db.rollback(save_point=save_point)
+			frappe.clear_last_message()
+			results[item.index] = _batch_result(item, "error", message=str(exc))
+			continue
+
+		results[item.index] = _batch_match_result(item, "ok", doc.name)
+		verified_on[item.candidate.profile] = max(item.time, verified_on.get(item.candidate.profile, item.time))
+
+	for item in matched:
+		if item.duplicate_of is None:
+			continue
+		original = results[item.duplicate_of] or {}
+		if original.get("status") == "error":
+			results[item.index] = _batch_result(item, "error", message=original.get("message"))
+		else:
+			results[item.index] = _batch_match_result(item, "duplicate", original.get("checkin"))
+
+	for profile, time in verified_on.items():
+		_mark_profile_verified(profile, time)
+
+	to_remember = {
+		item.key: {key: value for key, value in results[item.index].items() if key not in ("index", "status")}
+		for item in matched
+		if results[item.index] and results[item.index]["status"] != "error"
+	}
+	frappe.db.after_commit.add(lambda: _remember_batch_results(to_remember, reserved))
+
+	return results  # type: ignore[return-value]
+
+
+def _parse_batch_item(index: int, raw_item: Any, default_device_id: str | None) -> frappe._dict:
+	item = frappe._dict(raw_item if isinstance(raw_item, dict) else {})
+	item.index = index
+	item.device_id = item.device_id or default_device_id
+	item.duplicate_of = None
+
+	if not item.captured_at:
+		item.error = _("Capture time is missing.")
+		return item
+	try:
+		item.time = get_datetime(item.captured_at)
+	except Exception:
+		item.error = _("Capture time {0} is invalid.").format(item.captured_at)
+		return item
+	if item.time.tzinfo:
+		# Offsets such as the "Z" of JavaScript's toISOString() are stored as naive system time.
+		item.time = convert_utc_to_system_timezone(item.time).replace(tzinfo=None)
+
+	item.image_bytes = decode_image_safely(item.pop("image", None))
+	if not item.image_bytes:
+		item.error = _("Captured image is empty. Please try again.")
+		return item
+
+	if item.capture_id:
+		identity = f"{item.device_id}:{item.capture_id}"
+	else:
+		identity = hashlib.sha256(
+			b"".join((item.image_bytes, str(item.time).encode(), str(item.device_id).encode()))
+		).hexdigest()
+	item.key = hashlib.sha256(identity.encode("utf-8")).hexdigest()
+	return item
+
+
+def _batch_result(item: frappe._dict, status: str, **values: Any) -> Dict[str, Any]:
+	return {"index": item.index, "capture_id": item.capture_id, **values, "status": status}
+
+
+def _batch_match_result(item: frappe._dict, status: str, checkin: str | None) -> Dict[str, Any]:
+	return _batch_result(
+		item,
+		status,
+		employee=item.candidate.employee,
+		profile=item.candidate.profile,
+		sample=item.candidate.sample,
+		log_type=item.log_type,
+		time=item.time,
+		checkin=checkin,
+		distance=item.distance,
+		encoding_checksum=item.checksum,
+	)
+
+
+def _reserve_batch_item(key: str) -> bool:
+	cache = frappe.cache()
+	return bool(
+		cache.set(cache.make_key(f"{BATCH_RESERVATION_KEY}:{key}"), 1, nx=True, ex=BATCH_RESERVATION_TTL)
+	)
+
+
+def _release_batch_items(keys: List[str]) -> None:
+	if keys:
+		frappe.cache().delete_value([f"{BATCH_RESERVATION_KEY}:{key}" for key in keys])
+
+
+def _remember_batch_results(results: Dict[str, Dict[str, Any]], reserved: List[str]) -> None:
+	cache = frappe.cache()
+	for key, result in results.items():
+		cache.set_value(f"{BATCH_RESULT_CACHE_KEY}:{key}", result, expires_in_sec=BATCH_RESULT_TTL)
+	# Released only once the results are readable, so a resubmission always finds one or the other.
+	_release_batch_items(reserved)
+
+
+def _assign_batch_log_types(items: List[frappe._dict]) -> None:
+	"""Give every matched capture its IN/OUT type in chronological order per employee.
+
+	Existing check-ins from the batch's first capture on are interleaved, so a capture
+	that arrives late still alternates correctly with what other kiosks recorded
+	meanwhile. Captures that would leave a later check-in out of order (an odd number
+	of them between two existing logs) are not typed but flagged with ``conflict``.
+	"""
+	by_employee: Dict[str, List[frappe._dict]] = defaultdict(list)
+	for item in items:
+		by_employee[item.candidate.employee].append(item)
+
+	for employee, employee_items in by_employee.items():
+		employee_items.sort(key=lambda item: (item.time, item.index))
+		first = employee_items[0].time
+
+		previous = frappe.db.get_all(
+			"Employee Checkin",
+			filters={"employee": employee, "time": ["<", first]},
+			fields=["log_type"],
+			order_by="time desc",
+			limit=1,
+		)
+		existing = frappe.db.get_all(
+			"Employee Checkin",
+			filters={"employee": employee, "time": [">=", first]},
+			fields=["name", "log_type", "time"],
+			order_by="time asc",
+		)
+		existing_by_time = {get_datetime(row.time): row for row in existing}
+		seen: Dict[Any, frappe._dict] = {}
+
+		timeline = [(get_datetime(row.time), 0, row) for row in existing]
+		timeline += [(item.time, 1, item) for item in employee_items]
+		timeline.sort(key=lambda entry: (entry[0], entry[1]))
+
+		last_log_type = previous[0].log_type if previous else None
+		# Captures typed since the last existing check-in.
+		segment: List[frappe._dict] = []
+		for time, is_capture, entry in timeline:
+			if not is_capture:
+				if segment and entry.log_type == last_log_type:
+					for item in segment:
+						item.conflict = entry
+				last_log_type = entry.log_type
+				segment = []
+			elif time in existing_by_time:
+				entry.existing_checkin = existing_by_time[time].name
+				entry.log_type = existing_by_time[time].log_type
+			elif time in seen:
+				entry.duplicate_of = seen[time].index
+				entry.log_type = seen[time].log_type
+			else:
+				entry.log_type = "OUT" if last_log_type == "IN" else "IN"
+				last_log_type = entry.log_type
+				seen[time] = entry
+				segment.append(entry)
+
+
+def _match_faces_batch(
+	source_encodings: List[list[float]],
+	device_ids: List[str | None],
+	settings: BiometricAttendanceSettings,
+	network: Document | None = None,
+) -> List[tuple[EncodingCandidate, float] | tuple[None, None]]:
+	"""Batched counterpart of ``_match_face``: one matrix product per gallery partition."""
+	threshold = settings.confidence_threshold or 0.55
+	matches: List[tuple[EncodingCandidate, float] | tuple[None, None]] = [(None, None)] * len(source_encodings)
+
+	global_indexes: List[int] = []
+	scoped_indexes: Dict[tuple[str | None, str | None], List[int]] = defaultdict(list)
+	for index, device_id in enumerate(device_ids):
+		scope = settings.get_gallery_scope(device_id, network)
+		if scope == (None, None):
+			global_indexes.append(index)
+		else:
+			scoped_indexes[scope].append(index)
+
+	fallback = cint(settings.fallback_to_global_gallery)
+	for (branch, department), indexes in scoped_indexes.items():
+		local_matches = match_encodings_batch(
+			[source_encodings[index] for index in indexes],
+			load_scoped_encodings(branch, department),
+			threshold,
+		)
+		for index, match in zip(indexes, local_matches, strict=True):
+			matches[index] = match
+			if not match[0] and fallback:
+				global_indexes.append(index)
+
+	if global_indexes:
+		global_matches = match_encodings_batch(
+			[source_encodings[index] for index in global_indexes],
+			load_encoding_cache(),
+			threshold,
+		)
+		for index, match in zip(global_indexes, global_matches, strict=True):
+			matches[index] = match
+
+	return matches
+
+
+def _create_checkin(
+	employee: str,
+	log_type: str,
+	time,
+	device_id: str | None = None,
+	latitude: float | None = None,
+	longitude: float | None = None,
+):
+	from hrms.hr.doctype.employee_checkin.employee_checkin import EmployeeCheckin
+
 	doc: EmployeeCheckin = frappe.new_doc("Employee Checkin")
 	doc.employee = employee
 	doc.log_type = log_type
-	doc.time = now_datetime()
+	doc.time = time
 	doc.device_id = device_id
 	if latitude is not None:
 		doc.latitude = latitude
 	if longitude is not None:
 		doc.longitude = longitude
 	doc.insert()
+	return doc
+
 
+def _mark_profile_verified(profile: str, time) -> None:
 	frappe.db.set_value(
 		"Employee Biometric Profile",
-		candidate.profile,
+		profile,
 		{
-			"last_verified_on": doc.time,
+			"last_verified_on": time,
 			"last_verified_by": frappe.session.user,
 		},
 		update_modified=False,
 	)
 
-	return {
-		"employee": employee,
-		"profile": candidate.profile,
-		"sample": candidate.sample,
-		"log_type": log_type,
-		"time": doc.time,
-		"checkin": doc.name,
-		"distance": distance,
-		"encoding_checksum": checksum,
-	}
+
+def _match_face(
+	source_encoding: list[float],
+	settings: BiometricAttendanceSettings,
+	device_id: str | None = None,
+	network: Document | None = None,
+) -> tuple[EncodingCandidate | None, float | None, list[tuple[EncodingCandidate, float]]]:
+	"""Match against the kiosk's branch/department partition first, then the global gallery.
+
+	Returns ``(candidate, distance, ranked)`` where ``ranked`` holds the closest
+	candidates of the last gallery searched, for the attempt log.
+	"""
+	threshold = settings.confidence_threshold or 0.55
+	limit = cint(settings.max_match_count) or 3
+
+	branch, department = settings.get_gallery_scope(device_id, network)
+	if branch or department:
+		ranked = rank_encoding(source_encoding, load_scoped_encodings(branch, department), limit)
+		if ranked and ranked[0][1] <= threshold:
+			return ranked[0][0], ranked[0][1], ranked
+		if not cint(settings.fallback_to_global_gallery):
+			return None, None, ranked
+
+	candidates = load_encoding_cache()
+	if not candidates:
+		frappe.throw(_("No approved biometric profiles found. Contact your HR administrator."))
+
+	ranked = rank_encoding(source_encoding, candidates, limit)
+	if ranked and ranked[0][1] <= threshold:
+		return ranked[0][0], ranked[0][1], ranked
+	return None, None, ranked
+
+
+@frappe.whitelist()
+def enqueue_gallery_compaction() -> None:
+	frappe.has_permission("Biometric Attendance Settings", "write", throw=True)
+
+	frappe.enqueue(
+		"vulero_biometric_attendance.tasks.compact_biometric_gallery",
+		queue="long",
+		job_id="vulero_biometric_attendance:compact_gallery",
+		deduplicate=True,
+	)
 
 
 def _determine_log_type(employee: str) -> str:
@@ -202,8 +839,40 @@ def _determine_log_type(employee: str) -> str:
 
 @frappe.whitelist()
 def get_check_in_status(employee: str | None = None) -> Dict[str, Any]:
-    target_employee = _resolve_employee(employee)
+    return _build_check_in_status(_resolve_employee(employee))
+
+
+def publish_check_in_status(doc: Document, method: str | None = None) -> None:
+    """Employee Checkin hook: push the new or deleted log to the employee's open check-in pages.
+
+    Only the log and the server time are sent; the page derives the next action from
+    them and fetches the full status when the shift window moved on, so the write path
+    never pays for shift resolution.
+    """
+    if not frappe.db.exists("Employee Biometric Profile", {"employee": doc.employee}):
+        return
+
+    user = frappe.db.get_value("Employee", doc.employee, "user_id")
+    if not user:
+        return
+
+    frappe.publish_realtime(
+        CHECK_IN_STATUS_EVENT,
+        {
+            "employee": doc.employee,
+            "name": doc.name,
+            "log_type": doc.log_type,
+            "time": doc.time,
+            "shift": doc.shift,
+            "deleted": method == "after_delete",
+            "server_time": now_datetime(),
+        },
+        user=user,
+        after_commit=True,
+    )
+
 
+def _build_check_in_status(target_employee: str) -> Dict[str, Any]:
     latest = frappe.db.get_all(
         "Employee Checkin",
         filters={"employee": target_employee},
@@ -235,5 +904,6 @@ def get_check_in_status(employee: str | None = None) -> Dict[str, Any]:
 
     status["shift"] = shift_info
     status["server_time"] = current_time
+    status["burst_frame_count"] = max(cint(get_settings().burst_frame_count), 1)
 
     return status
@@ -0,0 +1,65 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("biometric-load-test")
+@click.option("--concurrency", default=10, type=int, help="Number of concurrent client threads.")
+@click.option("--requests", "total_requests", default=200, type=int, help="Total requests to send.")
+@click.option("--gallery-size", default=1000, type=int, help="Number of samples in the synthetic gallery.")
+@click.option(
+	"--status-ratio", default=0.2, type=float, help="Share of requests that call get_check_in_status."
+)
+@click.option("--miss-ratio", default=0.05, type=float, help="Share of check-ins with an unknown face.")
+@click.option(
+	"--real-images",
+	type=click.Path(exists=True, file_okay=False),
+	help="Directory of single-face images to encode with the real face_recognition library.",
+)
+@click.option("--commit", is_flag=True, default=False, help="Keep the Employee Checkin rows created.")
+@click.option("--seed", default=0, type=int)
+@pass_context
+def biometric_load_test(
+	context,
+	concurrency,
+	total_requests,
+	gallery_size,
+	status_ratio,
+	miss_ratio,
+	real_images,
+	commit,
+	seed,
+):
+	"""Simulate a shift-change rush against check_in_with_face and get_check_in_status."""
+	from vulero_biometric_attendance.loadtest import run_load_test
+
+	report = run_load_test(
+		get_site(context),
+		concurrency=concurrency,
+		total_requests=total_requests,
+		gallery_size=gallery_size,
+		status_ratio=status_ratio,
+		miss_ratio=miss_ratio,
+		image_dir=real_images,
+		commit=commit,
+		seed=seed,
+	)
+
+	click.echo(
+		f"{len(report.samples)} requests, concurrency {report.concurrency}, "
+		f"gallery {report.gallery_size}, {report.wall_time:.2f}s"
+	)
+	click.echo(
+		f"{'operation':<22}{'reqs':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}"
+		f"{'p95 ms':>9}{'p99 ms':>9}{'db/req':>8}{'redis/req':>11}"
+	)
+	for operation, row in report.summary().items():
+		click.echo(
+			f"{operation:<22}{row['requests']:>7}{row['errors']:>8}{row['throughput']:>9.1f}"
+			f"{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}"
+			f"{row['db_calls']:>8.1f}{row['redis_calls']:>11.1f}"
+		)
+	for error, count in report.top_errors():
+		click.echo(f"{count} x {error}")
+
+
+commands = [biometric_load_test]
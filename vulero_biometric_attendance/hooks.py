@@ -28,7 +28,10 @@ app_license = "mit"
 app_include_css = "/assets/vulero_biometric_attendance/css/biometric_checkin.css"
 
 after_install = "vulero_biometric_attendance.install.after_install"
-after_migrate = "vulero_biometric_attendance.install.after_install"
+after_migrate = [
+	"vulero_biometric_attendance.install.after_install",
+	"vulero_biometric_attendance.tasks.warm_encoding_cache",
+]
 
 # include js, css files in header of web template
 # web_include_css = "/assets/vulero_biometric_attendance/css/vulero_biometric_attendance.css"
@@ -134,6 +137,16 @@ after_migrate = "vulero_biometric_attendance.install.after_install"
 # ---------------
 # Hook on document methods and events
 
+doc_events = {
+	"Employee": {
+		"on_update": "vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric.invalidate_encoding_cache_for_employee",
+	},
+	"Employee Checkin": {
+		"after_insert": "vulero_biometric_attendance.api.publish_check_in_status",
+		"after_delete": "vulero_biometric_attendance.api.publish_check_in_status",
+	},
+}
+
 # doc_events = {
 # 	"*": {
 # 		"on_update": "method",
@@ -145,6 +158,20 @@ after_migrate = "vulero_biometric_attendance.install.after_install"
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"daily": [
+		"vulero_biometric_attendance.tasks.compact_biometric_gallery",
+	],
+	"cron": {
+		"* * * * *": [
+			"vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_checkin_attempt.biometric_checkin_attempt.flush_attempt_log",
+		],
+		"*/10 * * * *": [
+			"vulero_biometric_attendance.tasks.prewarm_encoding_cache_before_shifts",
+		],
+	},
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"vulero_biometric_attendance.tasks.all"
@@ -201,7 +228,9 @@ after_migrate = "vulero_biometric_attendance.install.after_install"
 
 # Request Events
 # ----------------
-# before_request = ["vulero_biometric_attendance.utils.before_request"]
+before_request = [
+	"vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric.preload_face_models"
+]
 # after_request = ["vulero_biometric_attendance.utils.after_request"]
 
 # Job Events
@@ -243,6 +272,6 @@ after_migrate = "vulero_biometric_attendance.install.after_install"
 # Automatically update python controller files with type annotations for this app.
 # export_python_type_annotations = True
 
-# default_log_clearing_doctypes = {
-# 	"Logging DocType Name": 30  # days to retain logs
-# }
+default_log_clearing_doctypes = {
+	"Biometric Checkin Attempt": 30,
+}
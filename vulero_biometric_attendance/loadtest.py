@@ -0,0 +1,342 @@
+"""Shift-change rush simulation for ``bench --site <site> biometric-load-test``.
+
+Requests call the whitelisted API functions in-process from a pool of threads, each
+with its own site connection, and roll back after every call unless ``commit`` is set.
+The encoding gallery cache is replaced by a synthetic gallery for the duration of the
+run and rebuilt from the site's profiles afterwards, so only run this against a test site.
+Check-in attempts are logged to a throwaway buffer that is discarded when the run ends.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+import frappe
+import numpy as np
+
+from vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_checkin_attempt import (
+	biometric_checkin_attempt,
+)
+from vulero_biometric_attendance.vulero_biometric_attendance.utils import biometric
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric import (
+	CACHE_KEY,
+	ENCODING_SIZE,
+	GLOBAL_PARTITION,
+	EncodingCandidate,
+	rebuild_encoding_cache,
+)
+
+PAYLOAD_PREFIX = b"loadtest:"
+# Attempts logged during a run go here instead of the buffer flush_attempt_log drains.
+ATTEMPT_BUFFER_KEY = f"{biometric_checkin_attempt.ATTEMPT_BUFFER_KEY}:loadtest"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+class DeterministicFaceRecognition:
+	"""Stand-in for ``face_recognition`` that turns synthetic payloads into encodings.
+
+	A payload ``loadtest:<index>:<noise>`` decodes to gallery vector ``index`` plus a
+	little seeded noise, well under the match threshold; ``loadtest:miss:<noise>``
+	decodes to an unrelated vector. No image decoding or dlib work is done, so the
+	harness measures everything around face encoding.
+	"""
+
+	def __init__(self, seed: int = 0) -> None:
+		self.seed = seed
+
+	def gallery_vector(self, index: int) -> np.ndarray:
+		return np.random.default_rng([self.seed, index]).normal(0.0, 0.1, ENCODING_SIZE)
+
+	def load_image_file(self, file: io.BytesIO) -> bytes:
+		return file.read()
+
+	def face_encodings(self, image: bytes) -> List[np.ndarray]:
+		if not image.startswith(PAYLOAD_PREFIX):
+			return []
+		target, noise_seed = image[len(PAYLOAD_PREFIX) :].decode().split(":")
+		noise = np.random.default_rng([self.seed, int(noise_seed), 1])
+		if target == "miss":
+			return [noise.normal(0.0, 0.1, ENCODING_SIZE)]
+		return [self.gallery_vector(int(target)) + noise.normal(0.0, 0.01, ENCODING_SIZE)]
+
+	@staticmethod
+	def face_distance(face_encodings: np.ndarray, face_to_compare: np.ndarray) -> np.ndarray:
+		if len(face_encodings) == 0:
+			return np.empty(0)
+		return np.linalg.norm(face_encodings - face_to_compare, axis=1)
+
+
+@dataclass
+class RequestSample:
+	operation: str
+	latency_ms: float
+	ok: bool
+	db_calls: int
+	redis_calls: int
+	error: str | None = None
+
+
+@dataclass
+class LoadTestReport:
+	concurrency: int
+	gallery_size: int
+	wall_time: float
+	samples: List[RequestSample] = field(default_factory=list)
+
+	def summary(self) -> Dict[str, Dict[str, Any]]:
+		by_operation: Dict[str, List[RequestSample]] = defaultdict(list)
+		for sample in self.samples:
+			by_operation[sample.operation].append(sample)
+		by_operation["all"] = self.samples
+
+		summary = {}
+		for operation, samples in by_operation.items():
+			if not samples:
+				continue
+			latencies = np.array([sample.latency_ms for sample in samples])
+			summary[operation] = {
+				"requests": len(samples),
+				"errors": sum(not sample.ok for sample in samples),
+				"throughput": len(samples) / self.wall_time if self.wall_time else 0.0,
+				"p50": float(np.percentile(latencies, 50)),
+				"p95": float(np.percentile(latencies, 95)),
+				"p99": float(np.percentile(latencies, 99)),
+				"db_calls": float(np.mean([sample.db_calls for sample in samples])),
+				"redis_calls": float(np.mean([sample.redis_calls for sample in samples])),
+			}
+		return summary
+
+	def top_errors(self, limit: int = 5) -> List[tuple[str, int]]:
+		counts: Dict[str, int] = defaultdict(int)
+		for sample in self.samples:
+			if sample.error:
+				counts[sample.error] += 1
+		return sorted(counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class _CallCounter:
+	"""Counts DB queries and Redis commands per thread by wrapping the client classes."""
+
+	def __init__(self) -> None:
+		self.local = threading.local()
+		self._patched: List[tuple[type, str, Callable]] = []
+
+	def reset(self) -> None:
+		self.local.db = 0
+		self.local.redis = 0
+
+	def counts(self) -> tuple[int, int]:
+		return getattr(self.local, "db", 0), getattr(self.local, "redis", 0)
+
+	def install(self) -> None:
+		from frappe.database.database import Database
+		from frappe.utils.redis_wrapper import RedisWrapper
+
+		self._wrap(Database, "sql", "db")
+		self._wrap(RedisWrapper, "execute_command", "redis")
+
+	def uninstall(self) -> None:
+		for owner, name, original in reversed(self._patched):
+			setattr(owner, name, original)
+		self._patched.clear()
+
+	def _wrap(self, owner: type, name: str, counter: str) -> None:
+		original = getattr(owner, name)
+		local = self.local
+
+		def counted(*args, **kwargs):
+			setattr(local, counter, getattr(local, counter, 0) + 1)
+			return original(*args, **kwargs)
+
+		self._patched.append((owner, name, original))
+		setattr(owner, name, counted)
+
+
+def run_load_test(
+	site: str,
+	concurrency: int = 10,
+	total_requests: int = 200,
+	gallery_size: int = 1000,
+	status_ratio: float = 0.2,
+	miss_ratio: float = 0.05,
+	image_dir: str | None = None,
+	commit: bool = False,
+	seed: int = 0,
+) -> LoadTestReport:
+	frappe.init(site=site)
+	frappe.connect()
+	employees = frappe.get_all(
+		"Employee", filters={"status": "Active"}, pluck="name", limit=max(gallery_size, 1)
+	)
+	frappe.destroy()
+	if not employees:
+		raise frappe.ValidationError("The load test needs at least one active Employee on the site.")
+
+	rng = np.random.default_rng(seed)
+	fake = None if image_dir else DeterministicFaceRecognition(seed)
+	if fake:
+		gallery, probes = _synthetic_gallery(fake, employees, gallery_size)
+	else:
+		gallery, probes = _image_gallery(site, image_dir, employees, gallery_size, seed)
+
+	jobs: queue.Queue = queue.Queue()
+	for index in range(total_requests):
+		if rng.random() < status_ratio:
+			jobs.put(("get_check_in_status", employees[index % len(employees)]))
+		elif fake and rng.random() < miss_ratio:
+			jobs.put(("check_in_with_face", _encode_payload(f"miss:{index}")))
+		else:
+			jobs.put(("check_in_with_face", probes(int(rng.integers(0, len(gallery))), index)))
+
+	counter = _CallCounter()
+	samples: List[RequestSample] = []
+	samples_lock = threading.Lock()
+	original_library = biometric.face_recognition
+	original_buffer_key = biometric_checkin_attempt.ATTEMPT_BUFFER_KEY
+
+	def worker() -> None:
+		from vulero_biometric_attendance import api
+
+		frappe.init(site=site)
+		frappe.connect()
+		frappe.set_user("Administrator")
+		frappe.local.request_ip = "127.0.0.1"
+		try:
+			while True:
+				try:
+					operation, argument = jobs.get_nowait()
+				except queue.Empty:
+					return
+				counter.reset()
+				started = time.perf_counter()
+				error = None
+				try:
+					if operation == "get_check_in_status":
+						api.get_check_in_status(employee=argument)
+					else:
+						api.check_in_with_face(image=argument, device_id="loadtest")
+					if commit:
+						frappe.db.commit()
+				except Exception as exc:
+					error = f"{type(exc).__name__}: {exc}"
+					frappe.clear_messages()
+				latency = (time.perf_counter() - started) * 1000
+				if not commit:
+					frappe.db.rollback()
+				db_calls, redis_calls = counter.counts()
+				with samples_lock:
+					samples.append(
+						RequestSample(operation, latency, error is None, db_calls, redis_calls, error)
+					)
+		finally:
+			frappe.destroy()
+
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		if fake:
+			biometric.face_recognition = fake
+		biometric_checkin_attempt.ATTEMPT_BUFFER_KEY = ATTEMPT_BUFFER_KEY
+		frappe.cache().hset(
+			CACHE_KEY, GLOBAL_PARTITION, json.dumps([candidate.__dict__ for candidate in gallery])
+		)
+		counter.install()
+
+		threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(concurrency, 1))]
+		started = time.perf_counter()
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		wall_time = time.perf_counter() - started
+	finally:
+		counter.uninstall()
+		biometric.face_recognition = original_library
+		biometric_checkin_attempt.ATTEMPT_BUFFER_KEY = original_buffer_key
+		frappe.cache().delete_value(ATTEMPT_BUFFER_KEY)
+		rebuild_encoding_cache()
+		frappe.destroy()
+
+	return LoadTestReport(
+		concurrency=concurrency, gallery_size=len(gallery), wall_time=wall_time, samples=samples
+	)
+
+
+def _synthetic_gallery(
+	fake: DeterministicFaceRecognition, employees: List[str], gallery_size: int
+) -> tuple[List[EncodingCandidate], Callable[[int, int], str]]:
+	gallery = [
+		EncodingCandidate(
+			employee=employees[index % len(employees)],
+			profile=f"LOADTEST-{index}",
+			sample=f"LOADTEST-{index}",
+			encoding=fake.gallery_vector(index).tolist(),
+		)
+		for index in range(gallery_size)
+	]
+	return gallery, lambda target, noise: _encode_payload(f"{target}:{noise}")
+
+
+def _image_gallery(
+	site: str, image_dir: str, employees: List[str], gallery_size: int, seed: int
+) -> tuple[List[EncodingCandidate], Callable[[int, int], str]]:
+	"""Encode real face images once; pad the gallery with random vectors up to ``gallery_size``."""
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		paths = sorted(
+			os.path.join(image_dir, name)
+			for name in os.listdir(image_dir)
+			if name.lower().endswith(IMAGE_EXTENSIONS)
+		)
+		images: List[str] = []
+		gallery: List[EncodingCandidate] = []
+		for path in paths:
+			with open(path, "rb") as image_file:
+				content = image_file.read()
+			encoding = biometric.try_encode_image(content)
+			if isinstance(encoding, str):
+				continue
+			index = len(gallery)
+			gallery.append(
+				EncodingCandidate(
+					employee=employees[index % len(employees)],
+					profile=f"LOADTEST-{index}",
+					sample=os.path.basename(path),
+					encoding=encoding[0],
+				)
+			)
+			images.append(base64.b64encode(content).decode())
+	finally:
+		frappe.destroy()
+
+	if not gallery:
+		raise frappe.ValidationError(f"No single-face images found in {image_dir}.")
+
+	rng = np.random.default_rng(seed)
+	real_count = len(gallery)
+	for index in range(real_count, gallery_size):
+		gallery.append(
+			EncodingCandidate(
+				employee=employees[index % len(employees)],
+				profile=f"LOADTEST-{index}",
+				sample=f"LOADTEST-{index}",
+				encoding=rng.normal(0.0, 0.1, ENCODING_SIZE).tolist(),
+			)
+		)
+
+	# Only the real images can be probed; padding just widens the search.
+	return gallery, lambda target, noise: images[target % real_count]
+
+
+def _encode_payload(payload: str) -> str:
+	return base64.b64encode(PAYLOAD_PREFIX + payload.encode()).decode()
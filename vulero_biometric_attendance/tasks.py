@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import frappe
+from frappe.utils import cint, get_time, now_datetime
+
+from vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_attendance_settings.biometric_attendance_settings import (
+	get_settings,
+)
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric import (
+	GALLERY_VERSION_KEY,
+	rebuild_encoding_cache,
+)
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.gallery import compact_gallery
+
+# How far ahead of a shift's check-in window the gallery is rebuilt. The cron entry in
+# hooks.py runs every 10 minutes, so every window is warmed at least twice.
+PREWARM_LEAD_MINUTES = 25
+MINUTES_PER_DAY = 24 * 60
+
+
+def warm_encoding_cache() -> None:
+	"""Rebuild the shared encoding gallery so the next check-in never pays for a cold cache.
+
+	Rebuild requests are deduplicated while this runs, so it repeats until no change was
+	requested during the last pass.
+	"""
+	if not frappe.db.exists("DocType", "Employee Biometric Profile"):
+		return
+
+	cache = frappe.cache()
+	while True:
+		version = cache.get_value(GALLERY_VERSION_KEY, expires=True)
+		rebuild_encoding_cache()
+		if cache.get_value(GALLERY_VERSION_KEY, expires=True) == version:
+			return
+		# Start a new transaction so the next pass sees the change that was just committed.
+		frappe.db.rollback()
+
+
+def prewarm_encoding_cache_before_shifts() -> None:
+	"""Warm the gallery shortly before any shift type opens its check-in window."""
+	if not get_settings().enabled:
+		return
+
+	now = now_datetime()
+	now_minutes = now.hour * 60 + now.minute
+	for opening in _get_check_in_opening_minutes():
+		if (opening - now_minutes) % MINUTES_PER_DAY <= PREWARM_LEAD_MINUTES:
+			warm_encoding_cache()
+			return
+
+
+def _get_check_in_opening_minutes() -> set[int]:
+	"""Return the minute-of-day at which each shift type starts accepting check-ins."""
+	openings: set[int] = set()
+	for shift in frappe.get_all(
+		"Shift Type",
+		fields=["start_time", "begin_check_in_before_shift_start_time"],
+	):
+		if shift.start_time is None:
+			continue
+		start = get_time(shift.start_time)
+		start_minutes = start.hour * 60 + start.minute
+		openings.add((start_minutes - cint(shift.begin_check_in_before_shift_start_time)) % MINUTES_PER_DAY)
+	return openings
+
+
+def compact_biometric_gallery() -> None:
+	"""Deactivate surplus samples so each employee keeps a bounded, representative set."""
+	compact_gallery(cint(get_settings().max_samples_per_employee))
@@ -0,0 +1,342 @@
+import base64
+import json
+from datetime import timezone
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import frappe
+from erpnext.setup.doctype.employee.test_employee import make_employee
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, get_datetime, get_system_timezone, now_datetime
+
+from vulero_biometric_attendance.api import (
+	BATCH_RESERVATION_KEY,
+	BATCH_RESULT_CACHE_KEY,
+	BURST_STATE_CACHE_KEY,
+	_assign_batch_log_types,
+	_FaceGalleries,
+	_match_face,
+	_parse_batch_item,
+	_reserve_batch_item,
+	check_in_batch,
+	check_in_with_face_burst,
+)
+from vulero_biometric_attendance.loadtest import PAYLOAD_PREFIX, DeterministicFaceRecognition
+from vulero_biometric_attendance.vulero_biometric_attendance.utils import biometric
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric import (
+	EncodingCandidate,
+	encode_images,
+	rebuild_encoding_cache,
+)
+
+KIOSK = "_Test Biometric Kiosk"
+
+
+def make_payload(index: int, noise: int) -> bytes:
+	return PAYLOAD_PREFIX + f"{index}:{noise}".encode()
+
+
+def make_capture(index: int, noise: int, captured_at, **values) -> dict:
+	return {
+		"image": base64.b64encode(make_payload(index, noise)).decode(),
+		"captured_at": captured_at,
+		**values,
+	}
+
+
+def make_data_url(payload: bytes) -> str:
+	return "data:image/jpeg;base64," + base64.b64encode(payload).decode()
+
+
+def to_utc_iso(system_time) -> str:
+	return system_time.replace(tzinfo=ZoneInfo(get_system_timezone())).astimezone(timezone.utc).isoformat()
+
+
+def make_profile(employee: str, encoding) -> str:
+	profile = frappe.get_doc(
+		{
+			"doctype": "Employee Biometric Profile",
+			"employee": employee,
+			"status": "Approved",
+			"biometric_samples": [
+				{"sample_name": "Sample 1", "encoding": json.dumps(encoding.tolist()), "is_active": 1}
+			],
+		}
+	)
+	profile.insert()
+	return profile.name
+
+
+def make_branch(name: str) -> str:
+	if not frappe.db.exists("Branch", name):
+		frappe.get_doc({"doctype": "Branch", "branch": name}).insert()
+	return name
+
+
+def make_checkin(employee: str, log_type: str, time) -> str:
+	doc = frappe.get_doc(
+		{"doctype": "Employee Checkin", "employee": employee, "log_type": log_type, "time": time}
+	)
+	doc.insert()
+	return doc.name
+
+
+class TestEncodeImages(FrappeTestCase):
+	def test_encode_images_in_worker_processes(self):
+		fake = DeterministicFaceRecognition(seed=3)
+		images = [make_payload(index, index) for index in range(5)] + [b"", b"not a face"]
+
+		with patch.object(biometric, "face_recognition", fake):
+			results = encode_images(images, max_workers=3)
+
+		self.assertEqual(len(results), len(images))
+		for image, result in zip(images[:5], results[:5], strict=True):
+			encoding, checksum = result
+			self.assertEqual(encoding, fake.face_encodings(image)[0].tolist())
+			self.assertTrue(checksum)
+		self.assertIsInstance(results[5], str)
+		self.assertIsInstance(results[6], str)
+
+
+class TestCheckInBatch(FrappeTestCase):
+	def setUp(self):
+		self.fake = DeterministicFaceRecognition(seed=11)
+		self.employee = make_employee("test_biometric_batch@example.com")
+		make_profile(self.employee, self.fake.gallery_vector(0))
+
+		settings = frappe.get_single("Biometric Attendance Settings")
+		settings.enabled = 1
+		settings.set("allowed_networks", [])
+		settings.set("kiosk_devices", [{"device_id": KIOSK}])
+		settings.max_capture_age_hours = 24
+		settings.save()
+
+		rebuild_encoding_cache()
+		self.face_recognition = patch.object(biometric, "face_recognition", self.fake)
+		self.face_recognition.start()
+
+	def tearDown(self):
+		self.face_recognition.stop()
+		frappe.db.rollback()
+		frappe.cache().delete_keys(BATCH_RESULT_CACHE_KEY)
+		frappe.cache().delete_keys(BATCH_RESERVATION_KEY)
+		rebuild_encoding_cache()
+
+	def test_batch_records_captures_in_order(self):
+		now = now_datetime()
+		# Timezone-aware ISO timestamps, as sent by JavaScript's toISOString().
+		first = to_utc_iso(add_to_date(now, minutes=-10)).replace("+00:00", "Z")
+		second = to_utc_iso(add_to_date(now, minutes=-5))
+		items = [
+			make_capture(0, 2, second, capture_id="b"),
+			make_capture(0, 1, first, capture_id="a"),
+			make_capture(0, 3, first, capture_id="c", device_id="_Test Unknown Kiosk"),
+			make_capture(0, 4, str(add_to_date(now, hours=-25)), capture_id="d"),
+			make_capture(0, 5, str(add_to_date(now, hours=1)), capture_id="e"),
+			make_capture(1, 6, str(add_to_date(now, minutes=-1)), capture_id="f"),
+		]
+
+		results = check_in_batch(items, device_id=KIOSK)
+
+		self.assertEqual(
+			[result["status"] for result in results], ["ok", "ok", "error", "error", "error", "error"]
+		)
+		self.assertEqual(results[1]["log_type"], "IN")
+		self.assertEqual(results[0]["log_type"], "OUT")
+		self.assertIsNone(results[1]["time"].tzinfo)
+		self.assertEqual(results[1]["time"], add_to_date(now, minutes=-10))
+		self.assertEqual(
+			frappe.get_all(
+				"Employee Checkin",
+				filters={"employee": self.employee},
+				fields=["log_type"],
+				order_by="time asc",
+				pluck="log_type",
+			),
+			["IN", "OUT"],
+		)
+
+		resubmitted = check_in_batch(items[:2], device_id=KIOSK)
+		self.assertEqual([result["status"] for result in resubmitted], ["duplicate", "duplicate"])
+		self.assertEqual(resubmitted[0]["checkin"], results[0]["checkin"])
+
+	def test_resubmission_is_answered_from_remembered_results(self):
+		items = [make_capture(0, 1, str(add_to_date(now_datetime(), minutes=-10)), capture_id="a")]
+		results = check_in_batch(items, device_id=KIOSK)
+		frappe.db.after_commit.run()
+		# With the check-in gone from the database, only the remembered result can answer.
+		frappe.db.delete("Employee Checkin", {"employee": self.employee})
+
+		resubmitted = check_in_batch(items, device_id=KIOSK)
+
+		self.assertEqual(resubmitted[0]["status"], "duplicate")
+		self.assertEqual(resubmitted[0]["checkin"], results[0]["checkin"])
+		self.assertFalse(frappe.db.exists("Employee Checkin", {"employee": self.employee}))
+
+	def test_capture_in_progress_is_not_recorded_twice(self):
+		items = [make_capture(0, 1, str(add_to_date(now_datetime(), minutes=-10)), capture_id="a")]
+		# Another submission of the same capture is still being ingested.
+		self.assertTrue(_reserve_batch_item(_parse_batch_item(0, items[0], KIOSK).key))
+
+		results = check_in_batch(items, device_id=KIOSK)
+
+		self.assertEqual(results[0]["status"], "error")
+		self.assertFalse(frappe.db.exists("Employee Checkin", {"employee": self.employee}))
+
+
+class TestCheckInWithFaceBurst(FrappeTestCase):
+	def setUp(self):
+		self.fake = DeterministicFaceRecognition(seed=17)
+		self.employee = make_employee("test_biometric_burst@example.com")
+		make_profile(self.employee, self.fake.gallery_vector(0))
+
+		settings = frappe.get_single("Biometric Attendance Settings")
+		settings.enabled = 1
+		settings.set("allowed_networks", [])
+		settings.set("kiosk_devices", [])
+		settings.max_burst_frames = 2
+		settings.save()
+
+		rebuild_encoding_cache()
+		self.face_recognition = patch.object(biometric, "face_recognition", self.fake)
+		self.face_recognition.start()
+
+	def tearDown(self):
+		self.face_recognition.stop()
+		frappe.db.rollback()
+		frappe.cache().delete_keys(BURST_STATE_CACHE_KEY)
+		rebuild_encoding_cache()
+
+	def test_accepts_a_bare_data_url(self):
+		result = check_in_with_face_burst(make_data_url(make_payload(0, 1)))
+
+		self.assertEqual(result["employee"], self.employee)
+		self.assertEqual(result["frames_processed"], 1)
+
+	def test_frames_sent_one_at_a_time(self):
+		miss = make_data_url(PAYLOAD_PREFIX + b"miss:2")
+		pending = check_in_with_face_burst([miss], burst_id="burst", final=0)
+		self.assertEqual(pending, {"pending": True, "frames_processed": 1})
+		self.assertFalse(frappe.db.exists("Employee Checkin", {"employee": self.employee}))
+
+		result = check_in_with_face_burst([make_data_url(make_payload(0, 3))], burst_id="burst", final=1)
+
+		self.assertEqual(result["employee"], self.employee)
+		self.assertEqual(result["frames_processed"], 2)
+
+	def test_burst_frame_limit(self):
+		frames = [make_data_url(PAYLOAD_PREFIX + f"miss:{noise}".encode()) for noise in range(2)]
+		check_in_with_face_burst(frames, burst_id="burst", final=0)
+
+		with self.assertRaises(frappe.ValidationError):
+			check_in_with_face_burst([make_data_url(make_payload(0, 4))], burst_id="burst", final=1)
+
+
+class TestGalleryPartitions(FrappeTestCase):
+	def setUp(self):
+		self.fake = DeterministicFaceRecognition(seed=13)
+		self.north, self.south = make_branch("_Test Biometric North"), make_branch("_Test Biometric South")
+		self.local = make_employee("test_biometric_north@example.com")
+		self.remote = make_employee("test_biometric_south@example.com")
+		frappe.db.set_value("Employee", self.local, "branch", self.north)
+		frappe.db.set_value("Employee", self.remote, "branch", self.south)
+		make_profile(self.local, self.fake.gallery_vector(0))
+		make_profile(self.remote, self.fake.gallery_vector(1))
+
+		self.settings = frappe.get_single("Biometric Attendance Settings")
+		self.settings.set("allowed_networks", [])
+		self.settings.set("kiosk_devices", [{"device_id": KIOSK, "branch": self.north}])
+		self.settings.fallback_to_global_gallery = 0
+
+		rebuild_encoding_cache()
+		self.face_recognition = patch.object(biometric, "face_recognition", self.fake)
+		self.face_recognition.start()
+
+	def tearDown(self):
+		self.face_recognition.stop()
+		frappe.db.rollback()
+		rebuild_encoding_cache()
+
+	def match(self, index: int, device_id: str | None = KIOSK) -> tuple[str | None, set[str]]:
+		"""Match a probe of gallery vector ``index``; return the employee and the ranked employees."""
+		probe = self.fake.face_encodings(make_payload(index, index))[0].tolist()
+		candidate, _distance, ranked = _match_face(probe, self.settings, device_id=device_id)
+		galleries = _FaceGalleries(self.settings, device_id=device_id)
+		self.assertEqual(galleries.match(probe, self.settings.confidence_threshold or 0.55)[0], candidate)
+		return candidate.employee if candidate else None, {row.employee for row, _distance in ranked}
+
+	def test_get_gallery_scope(self):
+		network = frappe._dict(branch=self.south, department=None)
+
+		self.assertEqual(self.settings.get_gallery_scope(KIOSK, network), (self.north, None))
+		self.assertEqual(self.settings.get_gallery_scope("_Test Unknown Kiosk", network), (self.south, None))
+		self.assertEqual(self.settings.get_gallery_scope(None, frappe._dict(branch=None)), (None, None))
+
+	def test_partition_is_searched_first(self):
+		self.assertEqual(self.match(0), (self.local, {self.local}))
+		self.assertEqual(self.match(1, device_id=None), (self.remote, {self.local, self.remote}))
+
+	def test_fallback_to_global_gallery(self):
+		self.assertEqual(self.match(1), (None, {self.local}))
+
+		self.settings.fallback_to_global_gallery = 1
+		self.assertEqual(self.match(1), (self.remote, {self.local, self.remote}))
+
+	def test_moved_employee_matches_in_new_partition_before_rebuild(self):
+		employee = frappe.get_doc("Employee", self.remote)
+		employee.branch = self.north
+		employee.save()
+
+		self.assertEqual(self.match(1), (self.remote, {self.local, self.remote}))
+		self.assertEqual(biometric.load_scoped_encodings(branch=self.south), [])
+
+
+class TestAssignBatchLogTypes(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def make_item(self, index: int, time) -> frappe._dict:
+		candidate = EncodingCandidate(employee=self.employee, profile="", sample="", encoding=[])
+		return frappe._dict(index=index, time=get_datetime(time), candidate=candidate, duplicate_of=None)
+
+	def test_interleaves_existing_checkins(self):
+		self.employee = make_employee("test_biometric_log_types@example.com")
+		start = get_datetime("2026-01-05 08:00:00")
+		make_checkin(self.employee, "IN", add_to_date(start, hours=-2))
+		existing = make_checkin(self.employee, "IN", add_to_date(start, hours=1))
+
+		items = [
+			self.make_item(0, add_to_date(start, hours=2)),
+			self.make_item(1, start),
+			self.make_item(2, add_to_date(start, hours=1)),
+			self.make_item(3, add_to_date(start, hours=2)),
+		]
+		_assign_batch_log_types(items)
+
+		self.assertEqual(items[1].log_type, "OUT")
+		self.assertEqual(items[2].existing_checkin, existing)
+		self.assertEqual(items[2].log_type, "IN")
+		self.assertEqual(items[0].log_type, "OUT")
+		self.assertEqual(items[3].duplicate_of, 0)
+		self.assertEqual(items[3].log_type, "OUT")
+		self.assertFalse(any(item.conflict for item in items))
+
+	def test_flags_captures_that_break_later_checkins(self):
+		self.employee = make_employee("test_biometric_log_types@example.com")
+		start = get_datetime("2026-01-05 08:00:00")
+		# A capture buffered at 08:00 arrives after the employee checked in elsewhere at 12:00.
+		later = make_checkin(self.employee, "IN", add_to_date(start, hours=4))
+
+		items = [self.make_item(0, start), self.make_item(1, add_to_date(start, hours=5))]
+		_assign_batch_log_types(items)
+
+		self.assertEqual(items[0].conflict.name, later)
+		self.assertIsNone(items[1].conflict)
+		self.assertEqual(items[1].log_type, "OUT")
+
+		# An IN/OUT pair fits in front of the later check-in.
+		items = [self.make_item(0, start), self.make_item(1, add_to_date(start, hours=1))]
+		_assign_batch_log_types(items)
+
+		self.assertEqual([item.log_type for item in items], ["IN", "OUT"])
+		self.assertFalse(any(item.conflict for item in items))
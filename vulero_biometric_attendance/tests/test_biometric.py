@@ -0,0 +1,92 @@
+import numpy as np
+from frappe.tests.utils import FrappeTestCase
+
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric import (
+	ENCODING_SIZE,
+	EncodingCandidate,
+	build_encoding_gallery,
+	match_encoding,
+	match_encodings_batch,
+	rank_encoding,
+)
+
+THRESHOLD = 0.55
+
+
+def make_candidates(vectors: np.ndarray, employees: list[str] | None = None) -> list[EncodingCandidate]:
+	return [
+		EncodingCandidate(
+			employee=employees[index] if employees else f"EMP-{index:04d}",
+			profile=f"PROFILE-{index:04d}",
+			sample=f"SAMPLE-{index:04d}",
+			encoding=vector.tolist(),
+		)
+		for index, vector in enumerate(vectors)
+	]
+
+
+class TestMatchEncodingsBatch(FrappeTestCase):
+	def setUp(self):
+		self.rng = np.random.default_rng(7)
+
+	def assert_matches_single_probe(self, probes: np.ndarray, candidates: list[EncodingCandidate]):
+		batch = match_encodings_batch(probes.tolist(), candidates, THRESHOLD)
+		self.assertEqual(len(batch), len(probes))
+		for probe, (candidate, distance) in zip(probes, batch, strict=True):
+			expected_candidate, expected_distance = match_encoding(probe.tolist(), candidates, THRESHOLD)
+			self.assertEqual(candidate, expected_candidate)
+			if expected_candidate is None:
+				self.assertIsNone(distance)
+			else:
+				self.assertAlmostEqual(distance, expected_distance, places=9)
+
+	def test_batch_matches_single_probe(self):
+		gallery = self.rng.normal(0.0, 0.1, (200, ENCODING_SIZE))
+		probes = np.vstack(
+			[
+				gallery[:150] + self.rng.normal(0.0, 0.02, (150, ENCODING_SIZE)),
+				self.rng.normal(0.0, 0.1, (50, ENCODING_SIZE)),
+			]
+		)
+		self.assert_matches_single_probe(probes, make_candidates(gallery))
+
+	def test_batch_matches_single_probe_near_threshold(self):
+		gallery = self.rng.normal(0.0, 0.1, (50, ENCODING_SIZE))
+		offsets = self.rng.normal(0.0, 1.0, (50, ENCODING_SIZE))
+		offsets /= np.linalg.norm(offsets, axis=1, keepdims=True)
+		scales = THRESHOLD + self.rng.uniform(-1e-6, 1e-6, (50, 1))
+		self.assert_matches_single_probe(gallery + offsets * scales, make_candidates(gallery))
+
+	def test_duplicate_encodings_resolve_to_first_sample(self):
+		# The same encoding enrolled under two employees at scattered gallery positions.
+		gallery = self.rng.normal(0.0, 0.1, (200, ENCODING_SIZE))
+		positions = self.rng.permutation(len(gallery))[:80].reshape(40, 2)
+		positions.sort(axis=1)
+		gallery[positions[:, 1]] = gallery[positions[:, 0]]
+		candidates = make_candidates(gallery)
+
+		for first, second in positions:
+			for probe in (gallery[first], gallery[first] + self.rng.normal(0.0, 0.02, ENCODING_SIZE)):
+				self.assertEqual(match_encoding(probe.tolist(), candidates, THRESHOLD)[0], candidates[first])
+				ranked = rank_encoding(probe.tolist(), candidates, limit=3)
+				self.assertEqual(
+					[candidate for candidate, _ in ranked[:2]], [candidates[first], candidates[second]]
+				)
+		self.assert_matches_single_probe(gallery[positions[:, 0]], candidates)
+
+	def test_batch_accepts_prebuilt_gallery(self):
+		gallery = self.rng.normal(0.0, 0.1, (20, ENCODING_SIZE))
+		candidates = make_candidates(gallery)
+		probes = (gallery + self.rng.normal(0.0, 0.02, gallery.shape)).tolist()
+
+		self.assertEqual(
+			match_encodings_batch(probes, build_encoding_gallery(candidates), THRESHOLD),
+			match_encodings_batch(probes, candidates, THRESHOLD),
+		)
+
+	def test_empty_inputs(self):
+		candidates = make_candidates(self.rng.normal(0.0, 0.1, (3, ENCODING_SIZE)))
+		probe = self.rng.normal(0.0, 0.1, ENCODING_SIZE).tolist()
+
+		self.assertEqual(match_encodings_batch([], candidates, THRESHOLD), [])
+		self.assertEqual(match_encodings_batch([probe], [], THRESHOLD), [(None, None)])
@@ -0,0 +1,204 @@
+import json
+
+import frappe
+import numpy as np
+from erpnext.setup.doctype.employee.test_employee import make_employee
+from frappe.tests.utils import FrappeTestCase
+
+from vulero_biometric_attendance.tests.test_biometric import make_candidates
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric import (
+	ENCODING_SIZE,
+	build_encoding_gallery,
+)
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.gallery import (
+	compact_gallery,
+	error_rate_curves,
+	find_close_pairs,
+	recommend_threshold,
+	sample_genuine_distances,
+	select_representative_samples,
+)
+
+CROSS_THRESHOLD = 0.5
+SAME_THRESHOLD = 0.1
+
+
+def brute_force_pairs(matrix: np.ndarray, employees: list[str]) -> tuple[dict, dict]:
+	collisions, redundant = {}, {}
+	for left in range(len(matrix)):
+		for right in range(left + 1, len(matrix)):
+			distance = float(np.linalg.norm(matrix[left] - matrix[right]))
+			if employees[left] != employees[right] and distance <= CROSS_THRESHOLD:
+				collisions[(left, right)] = distance
+			elif employees[left] == employees[right] and distance <= SAME_THRESHOLD:
+				redundant[(left, right)] = distance
+	return collisions, redundant
+
+
+class TestFindClosePairs(FrappeTestCase):
+	def setUp(self):
+		rng = np.random.default_rng(5)
+		centers = rng.normal(0.0, 0.1, (12, ENCODING_SIZE))
+		# Three samples per employee, a near-duplicate pair, and look-alike employees 10 and 11.
+		centers[11] = centers[10] + rng.normal(0.0, 0.01, ENCODING_SIZE)
+		self.employees = [f"EMP-{index // 3:04d}" for index in range(36)]
+		self.matrix = np.repeat(centers, 3, axis=0) + rng.normal(0.0, 0.02, (36, ENCODING_SIZE))
+		self.matrix[1] = self.matrix[0] + rng.normal(0.0, 0.001, ENCODING_SIZE)
+		self.gallery = build_encoding_gallery(make_candidates(self.matrix, self.employees))
+
+	def assert_pairs_equal(self, pairs, expected: dict):
+		self.assertEqual({(pair.left, pair.right) for pair in pairs}, set(expected))
+		for pair in pairs:
+			self.assertAlmostEqual(pair.distance, expected[(pair.left, pair.right)], places=6)
+		distances = [pair.distance for pair in pairs]
+		self.assertEqual(distances, sorted(distances))
+
+	def test_matches_brute_force_across_blocks(self):
+		expected_collisions, expected_redundant = brute_force_pairs(self.matrix, self.employees)
+		self.assertTrue(expected_collisions)
+		self.assertTrue(expected_redundant)
+
+		for block_size in (7, 16, 1024):
+			collisions, redundant = find_close_pairs(
+				self.gallery, CROSS_THRESHOLD, SAME_THRESHOLD, block_size=block_size
+			)
+			self.assert_pairs_equal(collisions, expected_collisions)
+			self.assert_pairs_equal(redundant, expected_redundant)
+
+	def test_limit_keeps_closest_pairs(self):
+		expected_collisions, _ = brute_force_pairs(self.matrix, self.employees)
+		closest = sorted(expected_collisions, key=expected_collisions.get)[:3]
+
+		collisions, _ = find_close_pairs(self.gallery, CROSS_THRESHOLD, SAME_THRESHOLD, block_size=7, limit=3)
+
+		self.assertEqual([(pair.left, pair.right) for pair in collisions], closest)
+
+
+class TestSampleGenuineDistances(FrappeTestCase):
+	def setUp(self):
+		self.rng = np.random.default_rng(9)
+
+	def make_gallery(self, sizes: list[int]):
+		# Tight clusters far apart: same-employee distances stay well under 1, others far above.
+		centers = self.rng.normal(0.0, 1.0, (len(sizes), ENCODING_SIZE))
+		matrix = np.repeat(centers, sizes, axis=0) + self.rng.normal(0.0, 0.01, (sum(sizes), ENCODING_SIZE))
+		employees = [f"EMP-{index:04d}" for index, size in enumerate(sizes) for _ in range(size)]
+		return matrix, build_encoding_gallery(make_candidates(matrix, employees))
+
+	def test_uses_every_pair_within_the_limit(self):
+		matrix, gallery = self.make_gallery([3, 1, 4])
+		expected = [
+			np.linalg.norm(matrix[left] - matrix[right])
+			for group in (range(0, 3), range(4, 8))
+			for left in group
+			for right in group
+			if left < right
+		]
+
+		distances = sample_genuine_distances(gallery, max_pairs=9, rng=self.rng)
+
+		np.testing.assert_allclose(np.sort(distances), np.sort(expected))
+
+	def test_draws_pairs_when_one_employee_has_many_samples(self):
+		# Enumerating this employee's pairs would take about 200 million index pairs.
+		_, gallery = self.make_gallery([20000, 1, 3])
+
+		distances = sample_genuine_distances(gallery, max_pairs=500, rng=self.rng)
+
+		self.assertEqual(len(distances), 500)
+		# Two distinct samples of the same employee every time.
+		self.assertTrue(np.all((distances > 0) & (distances < 1)))
+
+
+class TestThresholdCalibration(FrappeTestCase):
+	def setUp(self):
+		self.genuine = np.array([0.4, 0.1, 0.3, 0.2])
+		self.impostor = np.array([0.8, 0.35, 0.6, 0.7, 0.5])
+		self.thresholds = np.array([0.3, 0.35, 0.5])
+
+	def test_error_rate_curves(self):
+		far, frr = error_rate_curves(self.genuine, self.impostor, self.thresholds)
+
+		# Distances equal to the threshold are accepted, as in match_encoding.
+		np.testing.assert_allclose(far, [0.0, 0.2, 0.4])
+		np.testing.assert_allclose(frr, [0.25, 0.25, 0.0])
+
+	def test_error_rate_curves_without_genuine_pairs(self):
+		far, frr = error_rate_curves(np.empty(0), self.impostor, self.thresholds)
+
+		np.testing.assert_allclose(far, [0.0, 0.2, 0.4])
+		np.testing.assert_allclose(frr, [0.0, 0.0, 0.0])
+
+	def test_recommend_threshold(self):
+		far, frr = error_rate_curves(self.genuine, self.impostor, self.thresholds)
+
+		self.assertEqual(recommend_threshold(self.thresholds, far, frr, target_far=0.2), 0.35)
+		self.assertEqual(recommend_threshold(self.thresholds, far, frr, target_far=0.0), 0.3)
+		self.assertEqual(recommend_threshold(self.thresholds, far, frr, target_far=1.0), 0.5)
+
+	def test_recommend_threshold_falls_back_to_equal_error_rate(self):
+		far = np.array([0.3, 0.5, 0.7])
+		frr = np.array([0.6, 0.45, 0.1])
+
+		self.assertEqual(recommend_threshold(self.thresholds, far, frr, target_far=0.1), 0.35)
+
+
+class TestSelectRepresentativeSamples(FrappeTestCase):
+	def setUp(self):
+		self.rng = np.random.default_rng(3)
+
+	def test_picks_distinct_rows_among_duplicates(self):
+		matrix = np.repeat(self.rng.normal(0.0, 0.1, (1, ENCODING_SIZE)), 9, axis=0)
+		matrix[8] += 0.5
+
+		selected = select_representative_samples(matrix, 5)
+
+		self.assertEqual(len(set(selected)), 5)
+		self.assertIn(8, selected)
+
+	def test_covers_every_cluster(self):
+		centers = self.rng.normal(0.0, 1.0, (3, ENCODING_SIZE))
+		matrix = np.repeat(centers, [5, 3, 2], axis=0) + self.rng.normal(0.0, 0.01, (10, ENCODING_SIZE))
+
+		selected = select_representative_samples(matrix, 3)
+
+		self.assertEqual(sorted(np.searchsorted([5, 8], selected, side="right")), [0, 1, 2])
+		self.assertEqual(select_representative_samples(matrix[:2], 3), [0, 1])
+
+
+class TestCompactGallery(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_deactivates_redundant_samples(self):
+		rng = np.random.default_rng(4)
+		base = rng.normal(0.0, 0.1, ENCODING_SIZE)
+		# Three copies of one capture plus two distinct ones.
+		vectors = [base, base, base, base + 0.3, base - 0.3]
+		profile = frappe.get_doc(
+			{
+				"doctype": "Employee Biometric Profile",
+				"employee": make_employee("test_biometric_compact@example.com"),
+				"status": "Approved",
+				"biometric_samples": [
+					{
+						"sample_name": f"Sample {index}",
+						"encoding": json.dumps(vector.tolist()),
+						"is_active": 1,
+					}
+					for index, vector in enumerate(vectors)
+				],
+			}
+		).insert()
+
+		self.assertEqual(compact_gallery(max_samples=3), 2)
+
+		active = frappe.get_all(
+			"Employee Biometric Sample",
+			filters={"parent": profile.name, "is_active": 1},
+			pluck="sample_name",
+		)
+		self.assertEqual(len(active), 3)
+		self.assertIn("Sample 3", active)
+		self.assertIn("Sample 4", active)
+		self.assertEqual(compact_gallery(max_samples=3), 0)
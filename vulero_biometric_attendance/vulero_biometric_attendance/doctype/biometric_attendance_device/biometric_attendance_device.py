@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+from frappe.model.document import Document
+
+
+class BiometricAttendanceDevice(Document):
+	"""Child table row mapping a kiosk device_id to the branch or department it serves."""
@@ -0,0 +1,14 @@
+frappe.ui.form.on("Biometric Attendance Settings", {
+	refresh(frm) {
+		frm.add_custom_button(__("Compact Gallery Now"), () => {
+			frappe
+				.call({ method: "vulero_biometric_attendance.api.enqueue_gallery_compaction" })
+				.then(() => {
+					frappe.show_alert({
+						message: __("Gallery compaction queued."),
+						indicator: "green",
+					});
+				});
+		});
+	},
+});
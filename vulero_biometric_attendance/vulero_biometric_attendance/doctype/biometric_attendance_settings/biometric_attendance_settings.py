@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Tuple
 
 import frappe
 from frappe.model.document import Document
@@ -12,6 +12,28 @@ class BiometricAttendanceSettings(Document):
 	def get_allowed_networks(self) -> List[str]:
 		return [row.cidr for row in self.allowed_networks or []]
 
+	def is_registered_device(self, device_id: str | None) -> bool:
+		return bool(device_id) and any(row.device_id == device_id for row in self.kiosk_devices or [])
+
+	def get_gallery_scope(
+		self,
+		device_id: str | None = None,
+		network: Document | None = None,
+	) -> Tuple[str | None, str | None]:
+		"""Return the (branch, department) a request should be matched against first.
+
+		A kiosk device mapping takes precedence over the mapping of the network it connects from.
+		"""
+		if device_id:
+			for row in self.kiosk_devices or []:
+				if row.device_id == device_id and (row.branch or row.department):
+					return row.branch or None, row.department or None
+
+		if network is not None and (network.branch or network.department):
+			return network.branch or None, network.department or None
+
+		return None, None
+
 
 def get_settings() -> BiometricAttendanceSettings:
 	return frappe.get_single("Biometric Attendance Settings")
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Sequence
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+from frappe.utils import now_datetime
+
+# Attempts are queued in Redis and written in batches by ``flush_attempt_log``
+# so check-ins never wait on an extra INSERT.
+ATTEMPT_BUFFER_KEY = "vulero_biometric_attendance:checkin_attempt_buffer"
+FLUSH_BATCH_SIZE = 1000
+# Failed matches this close above the threshold are logged as near misses and
+# counted against the closest profile's failed_attempts.
+NEAR_MISS_MARGIN = 0.05
+
+_FIELDS = (
+	"attempt_time",
+	"outcome",
+	"source",
+	"message",
+	"employee",
+	"profile",
+	"distance",
+	"total_ms",
+	"device_id",
+	"ip_address",
+	"user",
+	"top_candidates",
+	"stage_timings",
+)
+
+
+class BiometricCheckinAttempt(Document):
+	"""High-volume log of face check-in attempts, written in batches from a Redis buffer."""
+
+	@staticmethod
+	def clear_old_logs(days: int = 30) -> None:
+		table = frappe.qb.DocType("Biometric Checkin Attempt")
+		frappe.db.delete(table, filters=(table.creation < (Now() - Interval(days=days))))
+
+
+class CheckinAttempt:
+	"""Collects per-stage timing and the outcome of one check-in request."""
+
+	def __init__(self, source: str, device_id: str | None = None, ip_address: str | None = None) -> None:
+		self.source = source
+		self.device_id = device_id
+		self.ip_address = ip_address
+		self.current_stage: str | None = None
+		self.timings: Dict[str, float] = {}
+		self.recorded = False
+		self._started = perf_counter()
+
+	@contextmanager
+	def stage(self, name: str) -> Iterator[None]:
+		self.current_stage = name
+		started = perf_counter()
+		try:
+			yield
+		finally:
+			elapsed = (perf_counter() - started) * 1000
+			self.timings[name] = round(self.timings.get(name, 0) + elapsed, 2)
+		# Only reached when the stage completes; a failure keeps it for record_failure.
+		self.current_stage = None
+
+	def record_match(self, candidate, distance: float, ranked: Sequence[tuple[Any, float]] = ()) -> None:
+		self.record("Matched", candidate=candidate, distance=distance, ranked=ranked)
+
+	def record_no_match(self, ranked: Sequence[tuple[Any, float]], threshold: float, message: str) -> None:
+		if ranked and ranked[0][1] <= threshold + NEAR_MISS_MARGIN:
+			candidate, distance = ranked[0]
+			self.record("Near Miss", candidate=candidate, distance=distance, ranked=ranked, message=message)
+		else:
+			self.record("Not Recognized", ranked=ranked, message=message)
+
+	def record_failure(self, exc: Exception) -> None:
+		# Network rejections are logged by assert_allowed_network itself.
+		if self.recorded or self.current_stage == "network":
+			return
+		outcome = "No Face" if self.current_stage in ("decode", "encode") else "Error"
+		self.record(outcome, message=str(exc))
+
+	def record(
+		self,
+		outcome: str,
+		candidate=None,
+		distance: float | None = None,
+		ranked: Sequence[tuple[Any, float]] = (),
+		message: str | None = None,
+	) -> None:
+		if self.recorded:
+			return
+		self.recorded = True
+		log_attempt(
+			outcome,
+			source=self.source,
+			message=message,
+			employee=getattr(candidate, "employee", None),
+			profile=getattr(candidate, "profile", None),
+			distance=distance,
+			total_ms=round((perf_counter() - self._started) * 1000, 2),
+			device_id=self.device_id,
+			ip_address=self.ip_address,
+			top_candidates=[
+				{
+					"employee": match.employee,
+					"profile": match.profile,
+					"sample": match.sample,
+					"distance": score,
+				}
+				for match, score in ranked
+			]
+			or None,
+			stage_timings=self.timings or None,
+		)
+
+
+def log_attempt(outcome: str, **values: Any) -> None:
+	"""Queue one attempt for the next batched flush."""
+	entry = {field: values.get(field) for field in _FIELDS}
+	entry["outcome"] = outcome
+	entry["attempt_time"] = str(now_datetime())
+	entry["user"] = frappe.session.user if getattr(frappe.local, "session", None) else None
+	try:
+		frappe.cache().rpush(ATTEMPT_BUFFER_KEY, json.dumps(entry, default=str))
+	except Exception:
+		# Losing a log line must never fail a check-in.
+		frappe.log_error("Biometric Checkin Attempt: unable to buffer attempt")
+
+
+def flush_attempt_log() -> None:
+	"""Move buffered attempts into the database with one bulk INSERT per batch."""
+	cache = frappe.cache()
+	while True:
+		raw_entries = cache.lrange(ATTEMPT_BUFFER_KEY, 0, FLUSH_BATCH_SIZE - 1)
+		if not raw_entries:
+			return
+
+		entries: List[Dict[str, Any]] = []
+		for raw in raw_entries:
+			try:
+				entries.append(json.loads(raw))
+			except (TypeError, ValueError):
+				continue
+
+		_insert_attempts(entries)
+		_increment_failed_attempts(entries)
+		frappe.db.commit()
+		cache.ltrim(ATTEMPT_BUFFER_KEY, len(raw_entries), -1)
+
+		if len(raw_entries) < FLUSH_BATCH_SIZE:
+			return
+
+
+def _insert_attempts(entries: List[Dict[str, Any]]) -> None:
+	if not entries:
+		return
+
+	now = now_datetime()
+	owner = frappe.session.user
+	fields = ["name", "creation", "modified", "owner", "modified_by", *_FIELDS]
+	values = []
+	for entry in entries:
+		row = [frappe.generate_hash(length=10), now, now, owner, owner]
+		for field in _FIELDS:
+			value = entry.get(field)
+			if field in ("top_candidates", "stage_timings") and value is not None:
+				value = json.dumps(value)
+			row.append(value)
+		values.append(row)
+
+	frappe.db.bulk_insert("Biometric Checkin Attempt", fields=fields, values=values)
+
+
+def _increment_failed_attempts(entries: List[Dict[str, Any]]) -> None:
+	near_misses = Counter(
+		entry["profile"] for entry in entries if entry.get("outcome") == "Near Miss" and entry.get("profile")
+	)
+	profile = frappe.qb.DocType("Employee Biometric Profile")
+	for name, count in near_misses.items():
+		(
+			frappe.qb.update(profile)
+			.set(profile.failed_attempts, profile.failed_attempts + count)
+			.where(profile.name == name)
+		).run()
@@ -0,0 +1,14 @@
+frappe.ui.form.on("Employee Biometric Profile", {
+	onload(frm) {
+		// Show each sample's thumbnail in the grid, falling back to the full capture.
+		frm.get_docfield("biometric_samples", "thumbnail").formatter = (value, df, options, doc) => {
+			const src = value || (doc && doc.image);
+			if (!src) {
+				return `<span class="text-muted">${__("Pending")}</span>`;
+			}
+			return `<img src="${encodeURI(src)}" alt="${frappe.utils.escape_html(
+				(doc && doc.sample_name) || ""
+			)}" style="height: 40px; width: 40px; object-fit: cover; border-radius: var(--border-radius);">`;
+		};
+	},
+});
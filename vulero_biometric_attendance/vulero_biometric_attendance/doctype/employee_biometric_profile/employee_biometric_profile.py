@@ -31,10 +31,10 @@ class EmployeeBiometricProfile(Document):
 		self._ensure_encodings_serializable()
 
 	def on_update(self) -> None:
-		invalidate_encoding_cache()
+		invalidate_encoding_cache(revoked_profile=self.name if self.status != "Approved" else None)
 
 	def on_trash(self) -> None:
-		invalidate_encoding_cache()
+		invalidate_encoding_cache(revoked_profile=self.name)
 
 	def _sync_employee_name(self) -> None:
 		if self.employee:
@@ -14,11 +14,14 @@ vulero_biometric_attendance.pages.BiometricCheckin = class {
 		});
 		this.stream = null;
 		this.next_log_type = "IN";
+		this.burst_frame_count = 1;
 		this.capture_in_progress = false;
+		this.status = null;
 
 		this.make_body();
 		this.bind_events();
 		this.fetch_status();
+		frappe.realtime.on("biometric_check_in_status", (log) => this.apply_checkin_event(log));
 	}
 
 	make_body() {
@@ -109,35 +112,76 @@ vulero_biometric_attendance.pages.BiometricCheckin = class {
 			method: "vulero_biometric_attendance.api.get_check_in_status",
 			freeze: show_alert,
 		}).then((r) => {
-			if (!r.message) {
-				return;
-			}
-			const { employee_name, last_log, next_log_type, shift, server_time } = r.message;
-			this.next_log_type = next_log_type;
-			this.$body
-				.find('[data-field="next-action"]')
-				.text(__("{0} ({1})", [next_log_type, employee_name || ""]))
-				.toggleClass("text-success", next_log_type === "IN")
-				.toggleClass("text-warning", next_log_type === "OUT");
-
-			const $detail = this.$body.find('[data-field="last-log"]');
-			if (last_log) {
-				const when = frappe.datetime.user_to_str(last_log.time) || last_log.time;
-				$detail.text(
-					__("Last {0} at {1}{2}", [
-						last_log.log_type,
-						when,
-						last_log.shift ? __(" (Shift: {0})", [last_log.shift]) : "",
-					])
-				);
-			} else {
-				$detail.text(__("No previous check-ins found."));
+			if (r.message) {
+				this.render_status(r.message);
 			}
+		});
+	}
 
-			this.render_shift_details(shift, server_time);
+	apply_checkin_event(log) {
+		if (!this.status || log.deleted) {
+			// The previous log is not known here; ask the server for the full status.
+			this.fetch_status();
+			return;
+		}
+		if (log.employee !== this.status.employee) {
+			return;
+		}
+		const last_log = this.status.last_log;
+		if (last_log && moment(log.time).isBefore(moment(last_log.time))) {
+			// A late upload from an offline kiosk does not change the latest log.
+			return;
+		}
+		const shift = this.status.shift;
+		const shift_moved_on =
+			(log.shift || null) !== (shift ? shift.name : null) ||
+			(shift &&
+				!moment(log.server_time).isBetween(
+					moment(shift.actual_start || shift.start),
+					moment(shift.actual_end || shift.end)
+				));
+		if (shift_moved_on) {
+			// The shift shown was resolved when the page loaded; ask the server again.
+			this.fetch_status();
+			return;
+		}
+		this.render_status({
+			...this.status,
+			last_log: log,
+			next_log_type: log.log_type === "IN" ? "OUT" : "IN",
+			server_time: log.server_time,
 		});
 	}
 
+	render_status(status) {
+		this.status = status;
+		const { employee_name, last_log, next_log_type, shift, server_time, burst_frame_count } =
+			status;
+		this.next_log_type = next_log_type;
+		this.burst_frame_count = burst_frame_count || 1;
+		this.$body
+			.find('[data-field="next-action"]')
+			.text(__("{0} ({1})", [next_log_type, employee_name || ""]))
+			.toggleClass("text-success", next_log_type === "IN")
+			.toggleClass("text-warning", next_log_type === "OUT");
+
+		const $detail = this.$body.find('[data-field="last-log"]');
+		if (last_log) {
+			const when = frappe.datetime.user_to_str(last_log.time) || last_log.time;
+			$detail.text(
+				__("Last {0} at {1}{2}", [
+					last_log.log_type,
+					when,
+					last_log.shift ? __(" (Shift: {0})", [last_log.shift]) : "",
+				])
+			);
+		} else {
+			$detail.text(__("No previous check-ins found."));
+		}
+
+		this.render_shift_details(shift, server_time);
+	}
+
 	render_shift_details(shift, server_time) {
 		const $window = this.$body.find('[data-field="shift-window"]');
 		const $progress = this.$body.find('[data-field="shift-progress"]');
@@ -173,17 +217,51 @@ vulero_biometric_attendance.pages.BiometricCheckin = class {
 		$progress.text(progressText);
 	}
 
-	capture_frame() {
+	capture_frame(max_width = null, quality = 0.9) {
 		const video = this.video;
 		if (!video || !video.videoWidth) {
 			throw new Error("Camera stream not ready");
 		}
+		const scale = max_width ? Math.min(1, max_width / video.videoWidth) : 1;
 		const canvas = this.canvas;
-		canvas.width = video.videoWidth;
-		canvas.height = video.videoHeight;
+		canvas.width = Math.round(video.videoWidth * scale);
+		canvas.height = Math.round(video.videoHeight * scale);
 		const context = canvas.getContext("2d");
 		context.drawImage(video, 0, 0, canvas.width, canvas.height);
-		return canvas.toDataURL("image/jpeg", 0.9);
+		return canvas.toDataURL("image/jpeg", quality);
+	}
+
+	send_burst(first_frame, count) {
+		// Each frame goes out as soon as it is taken; the next one is only captured when
+		// the server answers "pending", i.e. no frame so far matched clearly.
+		const deferred = $.Deferred();
+		const burst_id = frappe.utils.get_random(10);
+		const send = (index, frame) => {
+			frappe
+				.call({
+					method: "vulero_biometric_attendance.api.check_in_with_face_burst",
+					args: { frames: [frame], burst_id, final: index === count - 1 ? 1 : 0 },
+					freeze: true,
+					freeze_message: __("Verifying face and logging attendance..."),
+				})
+				.then((r) => {
+					if (!(r.message && r.message.pending)) {
+						deferred.resolve(r);
+						return;
+					}
+					let next_frame;
+					try {
+						next_frame = this.capture_frame(480, 0.8);
+					} catch (error) {
+						deferred.reject(error);
+						return;
+					}
+					send(index + 1, next_frame);
+				})
+				.fail((error) => deferred.reject(error));
+		};
+		send(0, first_frame);
+		return deferred.promise();
 	}
 
 	capture_and_checkin() {
@@ -195,11 +273,20 @@ vulero_biometric_attendance.pages.BiometricCheckin = class {
 			});
 			return;
 		}
+		if (this.capture_in_progress) {
+			return;
+		}
+
+		const use_burst = this.burst_frame_count > 1;
+		this.capture_in_progress = true;
+		this.set_camera_buttons(true);
 
 		let snapshot;
 		try {
-			snapshot = this.capture_frame();
+			snapshot = use_burst ? this.capture_frame(480, 0.8) : this.capture_frame();
 		} catch (error) {
+			this.capture_in_progress = false;
+			this.set_camera_buttons(!!this.stream);
 			frappe.msgprint({
 				indicator: "red",
 				message: __("Unable to capture an image from your camera."),
@@ -208,18 +295,16 @@ vulero_biometric_attendance.pages.BiometricCheckin = class {
 			return;
 		}
 
-		this.capture_in_progress = true;
-		this.set_camera_buttons(true);
 		this.set_status(__("Matching face data…"), "info");
 
-		const request = frappe.call({
-			method: "vulero_biometric_attendance.api.check_in_with_face",
-			args: {
-				image: snapshot,
-			},
-			freeze: true,
-			freeze_message: __("Verifying face and logging attendance..."),
-		});
+		const request = use_burst
+			? this.send_burst(snapshot, this.burst_frame_count)
+			: frappe.call({
+					method: "vulero_biometric_attendance.api.check_in_with_face",
+					args: { image: snapshot },
+					freeze: true,
+					freeze_message: __("Verifying face and logging attendance..."),
+			  });
 
 		const me = this;
 
@@ -228,7 +313,10 @@ vulero_biometric_attendance.pages.BiometricCheckin = class {
 				return;
 			}
 			const { log_type, time, distance } = r.message;
-			me.fetch_status();
+			if (!frappe.realtime.socket || !frappe.realtime.socket.connected) {
+				// The new log normally arrives through the biometric_check_in_status push.
+				me.fetch_status();
+			}
 			me.stop_camera();
 			me.set_status(__("{0} recorded at {1}", [log_type, frappe.datetime.user_to_str(time) || time]), "success");
 			frappe.show_alert({
@@ -0,0 +1,23 @@
+frappe.query_reports["Biometric Gallery Audit"] = {
+	filters: [
+		{
+			fieldname: "threshold",
+			label: __("Collision Threshold"),
+			fieldtype: "Float",
+			description: __("Flag samples of different employees closer than this. Defaults to the match threshold."),
+		},
+		{
+			fieldname: "redundancy_threshold",
+			label: __("Redundancy Threshold"),
+			fieldtype: "Float",
+			default: 0.2,
+			description: __("Flag samples of the same employee closer than this."),
+		},
+		{
+			fieldname: "limit",
+			label: __("Max Rows per Finding"),
+			fieldtype: "Int",
+			default: 1000,
+		},
+	],
+};
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_attendance_settings.biometric_attendance_settings import (
+	get_settings,
+)
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric import EncodingGallery
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.gallery import (
+	GalleryPair,
+	find_close_pairs,
+	load_gallery,
+)
+
+
+def execute(filters: dict | None = None):
+	filters = frappe._dict(filters or {})
+	threshold = flt(filters.threshold) or get_settings().confidence_threshold or 0.55
+	redundancy_threshold = flt(filters.redundancy_threshold) or 0.2
+	limit = cint(filters.limit) or 1000
+
+	gallery = load_gallery()
+	collisions, redundant = find_close_pairs(gallery, threshold, redundancy_threshold, limit=limit)
+
+	data = [_make_row(_("Cross-Employee Collision"), pair, gallery) for pair in collisions]
+	data += [_make_row(_("Redundant Sample"), pair, gallery) for pair in redundant]
+	return get_columns(), data
+
+
+def get_columns() -> list[dict]:
+	return [
+		{"fieldname": "finding", "label": _("Finding"), "fieldtype": "Data", "width": 180},
+		{"fieldname": "distance", "label": _("Distance"), "fieldtype": "Float", "precision": 4, "width": 100},
+		{
+			"fieldname": "employee",
+			"label": _("Employee"),
+			"fieldtype": "Link",
+			"options": "Employee",
+			"width": 140,
+		},
+		{
+			"fieldname": "profile",
+			"label": _("Profile"),
+			"fieldtype": "Link",
+			"options": "Employee Biometric Profile",
+			"width": 150,
+		},
+		{"fieldname": "sample", "label": _("Sample"), "fieldtype": "Data", "width": 160},
+		{
+			"fieldname": "other_employee",
+			"label": _("Other Employee"),
+			"fieldtype": "Link",
+			"options": "Employee",
+			"width": 140,
+		},
+		{
+			"fieldname": "other_profile",
+			"label": _("Other Profile"),
+			"fieldtype": "Link",
+			"options": "Employee Biometric Profile",
+			"width": 150,
+		},
+		{"fieldname": "other_sample", "label": _("Other Sample"), "fieldtype": "Data", "width": 160},
+	]
+
+
+def _make_row(finding: str, pair: GalleryPair, gallery: EncodingGallery) -> dict:
+	left = gallery.candidates[pair.left]
+	right = gallery.candidates[pair.right]
+	return {
+		"finding": finding,
+		"distance": pair.distance,
+		"employee": left.employee,
+		"profile": left.profile,
+		"sample": left.sample,
+		"other_employee": right.employee,
+		"other_profile": right.profile,
+		"other_sample": right.sample,
+	}
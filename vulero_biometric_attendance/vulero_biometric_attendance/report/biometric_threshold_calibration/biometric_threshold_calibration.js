@@ -0,0 +1,51 @@
+frappe.query_reports["Biometric Threshold Calibration"] = {
+	filters: [
+		{
+			fieldname: "target_far",
+			label: __("Target False Accept Rate (%)"),
+			fieldtype: "Float",
+			default: 0.1,
+		},
+		{
+			fieldname: "max_pairs",
+			label: __("Max Pairs Sampled"),
+			fieldtype: "Int",
+			default: 200000,
+		},
+		{
+			fieldname: "seed",
+			label: __("Random Seed"),
+			fieldtype: "Int",
+			description: __("Set a seed to make sampled results reproducible."),
+		},
+	],
+
+	onload(report) {
+		report.page.add_inner_button(__("Apply Recommended Threshold"), () => {
+			const row = (report.data || []).find((r) => r.recommended);
+			if (!row) {
+				frappe.msgprint(__("Run the report to compute a recommended threshold first."));
+				return;
+			}
+			frappe.confirm(
+				__("Set the match threshold in Biometric Attendance Settings to {0}?", [
+					row.threshold.toFixed(2),
+				]),
+				() => {
+					frappe
+						.call({
+							method: "vulero_biometric_attendance.vulero_biometric_attendance.report.biometric_threshold_calibration.biometric_threshold_calibration.apply_threshold",
+							args: { threshold: row.threshold },
+						})
+						.then((r) => {
+							frappe.show_alert({
+								message: __("Match threshold set to {0}", [r.message]),
+								indicator: "green",
+							});
+							report.refresh();
+						});
+				}
+			);
+		});
+	},
+};
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import frappe
+import numpy as np
+from frappe import _
+from frappe.utils import cint, flt
+
+from vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_attendance_settings.biometric_attendance_settings import (
+	get_settings,
+)
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.gallery import (
+	error_rate_curves,
+	load_gallery,
+	recommend_threshold,
+	sample_genuine_distances,
+	sample_impostor_distances,
+)
+
+THRESHOLD_STEPS = np.round(np.arange(0.30, 0.8001, 0.01), 2)
+
+
+def execute(filters: dict | None = None):
+	filters = frappe._dict(filters or {})
+	target_far = flt(filters.target_far or 0.1) / 100
+	max_pairs = cint(filters.max_pairs) or 200000
+	rng = np.random.default_rng(cint(filters.seed) or None)
+
+	gallery = load_gallery()
+	genuine = sample_genuine_distances(gallery, max_pairs, rng)
+	impostor = sample_impostor_distances(gallery, max_pairs, rng)
+	if not len(genuine) or not len(impostor):
+		return (
+			get_columns(),
+			[],
+			_(
+				"Calibration needs approved samples from at least two employees, one of them with two or more samples."
+			),
+		)
+
+	far, frr = error_rate_curves(genuine, impostor, THRESHOLD_STEPS)
+	recommended = recommend_threshold(THRESHOLD_STEPS, far, frr, target_far)
+	current = flt(get_settings().confidence_threshold or 0.55, 2)
+
+	data = [
+		{
+			"threshold": float(threshold),
+			"false_accept_rate": float(far[index]) * 100,
+			"false_reject_rate": float(frr[index]) * 100,
+			"is_current": cint(float(threshold) == current),
+			"recommended": cint(float(threshold) == recommended),
+		}
+		for index, threshold in enumerate(THRESHOLD_STEPS)
+	]
+
+	return (
+		get_columns(),
+		data,
+		None,
+		get_chart(far, frr),
+		get_summary(genuine, impostor, recommended, current),
+	)
+
+
+def get_columns() -> list[dict]:
+	return [
+		{
+			"fieldname": "threshold",
+			"label": _("Threshold"),
+			"fieldtype": "Float",
+			"precision": 2,
+			"width": 110,
+		},
+		{
+			"fieldname": "false_accept_rate",
+			"label": _("False Accept Rate"),
+			"fieldtype": "Percent",
+			"width": 150,
+		},
+		{
+			"fieldname": "false_reject_rate",
+			"label": _("False Reject Rate"),
+			"fieldtype": "Percent",
+			"width": 150,
+		},
+		{"fieldname": "is_current", "label": _("Current"), "fieldtype": "Check", "width": 90},
+		{"fieldname": "recommended", "label": _("Recommended"), "fieldtype": "Check", "width": 120},
+	]
+
+
+def get_chart(far: np.ndarray, frr: np.ndarray) -> dict:
+	return {
+		"data": {
+			"labels": [f"{threshold:.2f}" for threshold in THRESHOLD_STEPS],
+			"datasets": [
+				{"name": _("False Accept Rate"), "values": [round(value * 100, 3) for value in far]},
+				{"name": _("False Reject Rate"), "values": [round(value * 100, 3) for value in frr]},
+			],
+		},
+		"type": "line",
+		"lineOptions": {"hideDots": 1},
+	}
+
+
+def get_summary(genuine: np.ndarray, impostor: np.ndarray, recommended: float, current: float) -> list[dict]:
+	return [
+		{
+			"value": recommended,
+			"label": _("Recommended Threshold"),
+			"datatype": "Float",
+			"indicator": "Green",
+		},
+		{"value": current, "label": _("Current Threshold"), "datatype": "Float", "indicator": "Blue"},
+		{"value": len(genuine), "label": _("Genuine Pairs"), "datatype": "Int"},
+		{"value": len(impostor), "label": _("Impostor Pairs"), "datatype": "Int"},
+	]
+
+
+@frappe.whitelist()
+def apply_threshold(threshold: float) -> float:
+	frappe.has_permission("Biometric Attendance Settings", "write", throw=True)
+
+	threshold = flt(threshold, 2)
+	if not 0 < threshold < 1:
+		frappe.throw(_("Threshold must be between 0 and 1."))
+
+	settings = get_settings()
+	settings.confidence_threshold = threshold
+	settings.save()
+	return threshold
@@ -1,31 +1,55 @@
 from __future__ import annotations
 
 import base64
+import binascii
 import hashlib
 import io
 import json
-import numpy as np
+import multiprocessing
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
-from typing import Iterable, List, Sequence
+from functools import partial
+from types import ModuleType
+from typing import Callable, Iterable, List, Sequence
 
 import frappe
+import numpy as np
 from frappe import _
+from frappe.model.document import Document
 from frappe.utils import cint
 
 from vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_attendance_settings.biometric_attendance_settings import (
 	get_settings,
 )
+from vulero_biometric_attendance.vulero_biometric_attendance.doctype.biometric_checkin_attempt.biometric_checkin_attempt import (
+	log_attempt,
+)
+
+# Imported on first use by load_face_recognition(): the import loads dlib's models.
+face_recognition = None
+_import_error: ImportError | None = None
 
-try:
-	import face_recognition  # type: ignore
-except ImportError as exc:  # pragma: no cover - runtime guard
-	face_recognition = None  # type: ignore[assignment]
-	_import_error = exc
-else:
-	_import_error = None
+# One encoder pool per web worker process, created on the first batch that needs it.
+_encode_pool: ProcessPoolExecutor | None = None
+_encode_pool_size = 0
+_encode_pool_lock = threading.Lock()
 
 
-CACHE_KEY = "vulero_biometric_attendance:face_encodings"
+# Redis hash holding one JSON-encoded candidate list per gallery partition.
+CACHE_KEY = "vulero_biometric_attendance:face_encoding_gallery"
+# Changed whenever a rebuild is requested, so a rebuild already running repeats itself.
+GALLERY_VERSION_KEY = "vulero_biometric_attendance:face_encoding_gallery_version"
+REBUILD_JOB_ID = "vulero_biometric_attendance:rebuild_encoding_gallery"
+GLOBAL_PARTITION = "global"
+ENCODING_SIZE = 128
+ENROLLMENT_IMAGE_SIZE = 1024
+ENROLLMENT_THUMBNAIL_SIZE = 160
+# Squared-distance slack used to re-check near-ties of the expanded distance formula
+# against the exact per-row norm, so batched and single-probe matching agree.
+_BATCH_TIE_TOLERANCE = 1e-9
 
 
 class BiometricDependencyMissing(frappe.ValidationError):
@@ -38,10 +62,37 @@ class EncodingCandidate:
 	profile: str
 	sample: str
 	encoding: Sequence[float]
+	branch: str | None = None
+	department: str | None = None
+
+
+@dataclass(frozen=True)
+class EncodingGallery:
+	"""Candidates stacked into a matrix together with their precomputed squared norms."""
+
+	candidates: list[EncodingCandidate]
+	matrix: np.ndarray
+	squared_norms: np.ndarray
+
+	def __len__(self) -> int:
+		return len(self.candidates)
+
+
+def load_face_recognition():
+	"""Import face_recognition once per process; the import loads dlib's models (about 2 s)."""
+	global face_recognition, _import_error
+	if face_recognition is None and _import_error is None:
+		try:
+			import face_recognition as library  # type: ignore
+		except ImportError as exc:  # pragma: no cover - runtime guard
+			_import_error = exc
+		else:
+			face_recognition = library
+	return face_recognition
 
 
 def ensure_library_available() -> None:
-	if face_recognition is None:  # pragma: no cover - executed when dependency missing
+	if load_face_recognition() is None:  # pragma: no cover - executed when dependency missing
 		message = _("face_recognition library could not be imported. Install system dependencies and run bench pip install face-recognition.")
 		raise BiometricDependencyMissing(message) from _import_error
 
@@ -50,92 +101,364 @@ def decode_image(data_url: str | None) -> bytes:
 	if not data_url:
 		frappe.throw(_("No image data provided."))
 
+	file_bytes = decode_image_safely(data_url)
+	if not file_bytes:
+		frappe.throw(_("Captured image is empty. Please try again."))
+	return file_bytes
+
+
+def decode_image_safely(data_url: str | None) -> bytes:
+	"""Decode a base64 image or data URL, returning empty bytes instead of raising."""
+	if not data_url:
+		return b""
+
 	try:
 		header, encoded = data_url.split(",", 1)
 	except ValueError:
 		encoded = data_url
-	file_bytes = base64.b64decode(encoded)
-	if not file_bytes:
-		frappe.throw(_("Captured image is empty. Please try again."))
-	return file_bytes
+	try:
+		return base64.b64decode(encoded)
+	except (binascii.Error, ValueError):
+		return b""
+
+
+def downscale_image(image_content: bytes, max_size: int, quality: int = 85) -> bytes:
+	"""Return a JPEG no larger than ``max_size`` pixels on its longest side."""
+	from PIL import Image, ImageOps
+
+	with Image.open(io.BytesIO(image_content)) as image:
+		image = ImageOps.exif_transpose(image).convert("RGB")
+		image.thumbnail((max_size, max_size))
+		output = io.BytesIO()
+		image.save(output, format="JPEG", quality=quality, optimize=True)
+	return output.getvalue()
 
 
 def encode_image(image_content: bytes) -> tuple[list[float], str]:
 	ensure_library_available()
 
-	image = face_recognition.load_image_file(io.BytesIO(image_content))
-	encodings = face_recognition.face_encodings(image)
+	encodings = _detect_face_encodings(image_content)
+	error = _get_face_count_error(encodings)
+	if error:
+		frappe.throw(error)
+
+	return _serialize_encoding(encodings[0])
+
+
+def encode_images(images: Sequence[bytes], max_workers: int = 4) -> list[tuple[list[float], str] | str]:
+	"""Encode several captures on this process's pool of encoder processes.
+
+	dlib releases the GIL while detecting faces but holds it while computing the
+	descriptor, so threads would run most of the work one image at a time. The pool
+	is long-lived and holds at most ``max_workers`` processes, which are started from
+	a fork server instead of being forked from the (threaded) web worker.
+
+	Returns, per image and in input order, either ``(encoding, checksum)`` or a
+	user-facing error message, so one bad frame never fails the whole batch.
+	"""
+	ensure_library_available()
+
+	if max_workers <= 1 or len(images) <= 1:
+		detections = [_detect_face_encodings_safely(image) for image in images]
+	else:
+		# A stand-in such as the load test's only exists in this process, so it is sent
+		# along with each image; the workers import the real library themselves.
+		library = None if isinstance(face_recognition, ModuleType) else face_recognition
+		pool = _get_encode_pool(max_workers)
+		try:
+			detections = list(pool.map(partial(_detect_face_encodings_safely, library=library), images))
+		except BrokenProcessPool:
+			_discard_encode_pool(pool)
+			raise
+
+	return [_finalize_detection(encodings) for encodings in detections]
+
+
+def _get_encode_pool(max_workers: int) -> ProcessPoolExecutor:
+	global _encode_pool, _encode_pool_size
+	with _encode_pool_lock:
+		if _encode_pool is None or _encode_pool_size != max_workers:
+			if _encode_pool is not None:
+				_encode_pool.shutdown(wait=False)
+			context = multiprocessing.get_context("forkserver")
+			# Workers fork from a server that already imported the library and its models.
+			context.set_forkserver_preload([__name__, "face_recognition"])
+			_encode_pool = ProcessPoolExecutor(
+				max_workers=max_workers, mp_context=context, initializer=load_face_recognition
+			)
+			_encode_pool_size = max_workers
+		return _encode_pool
+
+
+def _discard_encode_pool(pool: ProcessPoolExecutor) -> None:
+	global _encode_pool
+	with _encode_pool_lock:
+		if _encode_pool is pool:
+			_encode_pool = None
+	pool.shutdown(wait=False)
+
+
+def try_encode_image(image_content: bytes) -> tuple[list[float], str] | str:
+	"""Encode one capture, returning a user-facing error message instead of raising."""
+	ensure_library_available()
+
+	return _finalize_detection(_detect_face_encodings_safely(image_content))
+
+
+def _finalize_detection(encodings: list[np.ndarray] | None) -> tuple[list[float], str] | str:
+	if encodings is None:
+		return _("Captured image could not be read.")
+	return _get_face_count_error(encodings) or _serialize_encoding(encodings[0])
+
+
+def _detect_face_encodings(image_content: bytes, library=None) -> list[np.ndarray]:
+	# May run in an encoder pool process: must not touch frappe.local.
+	library = library or load_face_recognition()
+	image = library.load_image_file(io.BytesIO(image_content))
+	return library.face_encodings(image)
+
+
+def _detect_face_encodings_safely(image_content: bytes, library=None) -> list[np.ndarray] | None:
+	try:
+		return _detect_face_encodings(image_content, library)
+	except Exception:
+		return None
+
+
+def _get_face_count_error(encodings: Sequence[np.ndarray]) -> str | None:
 	if not encodings:
-		frappe.throw(_("No face detected in the captured image. Please try again."))
+		return _("No face detected in the captured image. Please try again.")
 	if len(encodings) > 1:
-		frappe.throw(_("Multiple faces detected. Capture a photo with a single face."))
+		return _("Multiple faces detected. Capture a photo with a single face.")
+	return None
+
 
-	encoding_vector = encodings[0].tolist()
+def _serialize_encoding(encoding: np.ndarray) -> tuple[list[float], str]:
+	encoding_vector = encoding.tolist()
 	encoding_checksum = hashlib.sha256(json.dumps(encoding_vector).encode("utf-8")).hexdigest()
 
 	return encoding_vector, encoding_checksum
 
 
-def match_encoding(
-	source_encoding: Sequence[float],
-	candidates: Iterable[EncodingCandidate],
-	threshold: float,
-) -> tuple[EncodingCandidate, float] | tuple[None, None]:
-	ensure_library_available()
-
-	candidates = list(candidates)
-	if not candidates:
-		return None, None
-
+def build_encoding_gallery(candidates: Iterable[EncodingCandidate]) -> EncodingGallery:
 	encoding_vectors: list[np.ndarray] = []
 	valid_candidates: list[EncodingCandidate] = []
 	for candidate in candidates:
 		vector = np.array(candidate.encoding, dtype="float64")
-		if vector.shape[0] != 128:
+		if vector.shape[0] != ENCODING_SIZE:
 			continue
 		encoding_vectors.append(vector)
 		valid_candidates.append(candidate)
 
-	if not encoding_vectors:
-		return None, None
+	if encoding_vectors:
+		matrix = np.stack(encoding_vectors, axis=0)
+	else:
+		matrix = np.empty((0, ENCODING_SIZE), dtype="float64")
+
+	return EncodingGallery(
+		candidates=valid_candidates,
+		matrix=matrix,
+		squared_norms=np.einsum("ij,ij->i", matrix, matrix),
+	)
+
+
+def squared_distance_matrix(
+	probes: np.ndarray,
+	gallery: np.ndarray,
+	gallery_squared_norms: np.ndarray | None = None,
+) -> np.ndarray:
+	"""Return all pairwise squared euclidean distances as one (M, N) matrix product.
+
+	Uses ||a||² + ||b||² - 2ab so the heavy lifting is a single BLAS call.
+	"""
+	if gallery_squared_norms is None:
+		gallery_squared_norms = np.einsum("ij,ij->i", gallery, gallery)
+	probe_squared_norms = np.einsum("ij,ij->i", probes, probes)
+
+	distances = probes @ gallery.T
+	distances *= -2.0
+	distances += probe_squared_norms[:, None]
+	distances += gallery_squared_norms[None, :]
+	return np.maximum(distances, 0.0, out=distances)
+
+
+def match_encoding(
+	source_encoding: Sequence[float],
+	candidates: Iterable[EncodingCandidate],
+	threshold: float,
+) -> tuple[EncodingCandidate, float] | tuple[None, None]:
+	ranked = rank_encoding(source_encoding, candidates, limit=1)
+	if ranked and ranked[0][1] <= threshold:
+		return ranked[0]
+
+	return None, None
+
+
+def rank_encoding(
+	source_encoding: Sequence[float],
+	candidates: Iterable[EncodingCandidate] | EncodingGallery,
+	limit: int = 3,
+) -> list[tuple[EncodingCandidate, float]]:
+	"""Return the ``limit`` closest candidates as ``(candidate, distance)``, closest first.
+
+	Exact ties keep gallery order, so the closest candidate is the one ``argmin`` picks.
+	"""
+	ensure_library_available()
+
+	gallery = candidates if isinstance(candidates, EncodingGallery) else build_encoding_gallery(candidates)
+	if not len(gallery):
+		return []
 
 	source_array = np.array(list(source_encoding), dtype="float64")
-	if source_array.shape[0] != 128:
+	if source_array.shape[0] != ENCODING_SIZE:
 		frappe.throw(_("Captured encoding is invalid. Please retry the capture."))
 
-	enc_matrix = np.stack(encoding_vectors, axis=0)
-	distances = face_recognition.face_distance(enc_matrix, source_array)
+	distances = face_recognition.face_distance(gallery.matrix, source_array)
 
-	best_index = int(distances.argmin())
-	best_distance = float(distances[best_index])
-	best_candidate = valid_candidates[best_index]
+	if limit <= 1:
+		closest = np.array([distances.argmin()])
+	else:
+		closest = np.argsort(distances, kind="stable")[:limit]
+	return [(gallery.candidates[int(index)], float(distances[index])) for index in closest]
 
-	if best_distance <= threshold:
-		return best_candidate, best_distance
 
-	return None, None
+def match_encodings_batch(
+	source_encodings: Sequence[Sequence[float]],
+	candidates: Iterable[EncodingCandidate] | EncodingGallery,
+	threshold: float,
+) -> list[tuple[EncodingCandidate, float] | tuple[None, None]]:
+	"""Match M probes against the gallery with one vectorized distance computation.
+
+	Returns one ``(candidate, distance)`` pair per probe, in input order, with the same
+	result ``match_encoding`` would give for that probe on its own.
+	"""
+	gallery = candidates if isinstance(candidates, EncodingGallery) else build_encoding_gallery(candidates)
+	if not len(source_encodings):
+		return []
+	if not len(gallery):
+		return [(None, None)] * len(source_encodings)
+
+	probes = np.array([list(encoding) for encoding in source_encodings], dtype="float64")
+	if probes.ndim != 2 or probes.shape[1] != ENCODING_SIZE:
+		frappe.throw(_("Captured encoding is invalid. Please retry the capture."))
+
+	squared = squared_distance_matrix(probes, gallery.matrix, gallery.squared_norms)
+
+	results: list[tuple[EncodingCandidate, float] | tuple[None, None]] = []
+	for probe, row in zip(probes, squared, strict=True):
+		# Re-rank the near-ties with the exact norm face_recognition.face_distance uses.
+		near = np.flatnonzero(row <= row.min() + _BATCH_TIE_TOLERANCE)
+		exact = np.linalg.norm(gallery.matrix[near] - probe, axis=1)
+		best = int(exact.argmin())
+		best_distance = float(exact[best])
+		if best_distance <= threshold:
+			results.append((gallery.candidates[int(near[best])], best_distance))
+		else:
+			results.append((None, None))
+
+	return results
+
+
+def get_partition_key(branch: str | None = None, department: str | None = None) -> str:
+	if branch:
+		return f"branch:{branch}"
+	if department:
+		return f"department:{department}"
+	return GLOBAL_PARTITION
+
+
+def load_encoding_cache(force: bool = False, partition: str = GLOBAL_PARTITION) -> list[EncodingCandidate]:
+	if not force:
+		cache = frappe.cache()
+		cached = cache.hget(CACHE_KEY, partition)
+		if cached is not None:
+			return [EncodingCandidate(**candidate) for candidate in json.loads(cached)]
+		if partition != GLOBAL_PARTITION and cache.hget(CACHE_KEY, GLOBAL_PARTITION) is not None:
+			# The gallery is warm; this partition simply has no enrolled employees.
+			return []
+
+	return rebuild_encoding_cache().get(partition, [])
+
+
+def load_scoped_encodings(
+	branch: str | None = None, department: str | None = None
+) -> list[EncodingCandidate]:
+	"""Return the local gallery for a branch and/or department.
+
+	Partitions are keyed by branch when one is given, so a department restriction on
+	top of a branch is applied to the (already small) branch partition in memory.
+	"""
+	candidates = load_encoding_cache(partition=get_partition_key(branch, department))
+	if branch and department:
+		candidates = [candidate for candidate in candidates if candidate.department == department]
+	return candidates
+
 
+def rebuild_encoding_cache() -> dict[str, list[EncodingCandidate]]:
+	"""Rebuild every gallery partition from approved profiles and overwrite the cache in place.
+
+	Previous values stay readable until the new ones are written, so concurrent
+	check-ins never observe an empty cache while the rebuild runs.
+	"""
+	partitions: dict[str, list[EncodingCandidate]] = defaultdict(list)
+	partitions[GLOBAL_PARTITION] = []
+	for candidate in _collect_candidates():
+		partitions[GLOBAL_PARTITION].append(candidate)
+		if candidate.branch:
+			partitions[get_partition_key(branch=candidate.branch)].append(candidate)
+		if candidate.department:
+			partitions[get_partition_key(department=candidate.department)].append(candidate)
 
-def load_encoding_cache(force: bool = False) -> list[EncodingCandidate]:
 	cache = frappe.cache()
-	if force:
-		cache.delete_value(CACHE_KEY)
+	stale_keys = {frappe.safe_decode(key) for key in cache.hkeys(CACHE_KEY) or []} - set(partitions)
+	# The global field goes last: load_encoding_cache reads a missing partition next to a
+	# present global one as "no enrolled employees", so every partition must exist first.
+	for key in sorted(partitions, key=lambda key: key == GLOBAL_PARTITION):
+		cache.hset(CACHE_KEY, key, json.dumps([candidate.__dict__ for candidate in partitions[key]]))
+	for key in stale_keys:
+		cache.hdel(CACHE_KEY, key)
+
+	return dict(partitions)
 
-	cached = cache.get_value(CACHE_KEY)
-	if cached:
-		return [EncodingCandidate(**candidate) for candidate in json.loads(cached)]
 
+def _collect_candidates(employee: str | None = None) -> list[EncodingCandidate]:
+	filters = {"status": "Approved"}
+	if employee:
+		filters["employee"] = employee
 	profiles = frappe.get_all(
 		"Employee Biometric Profile",
-		fields=["name", "employee", "status"],
-		filters={"status": "Approved"},
+		fields=["name", "employee"],
+		filters=filters,
 	)
-	candidates: list[EncodingCandidate] = []
+	if not profiles:
+		return []
+
+	employees = {
+		row.name: row
+		for row in frappe.get_all(
+			"Employee",
+			fields=["name", "branch", "department"],
+			filters={"name": ["in", [profile.employee for profile in profiles]]},
+		)
+	}
+	samples_by_profile: dict[str, list] = defaultdict(list)
+	for sample in frappe.get_all(
+		"Employee Biometric Sample",
+		fields=["name", "parent", "sample_name", "encoding"],
+		filters={
+			"parenttype": "Employee Biometric Profile",
+			"parent": ["in", [profile.name for profile in profiles]],
+			"is_active": 1,
+		},
+		order_by="idx asc",
+	):
+		samples_by_profile[sample.parent].append(sample)
 
+	candidates: list[EncodingCandidate] = []
 	for profile in profiles:
-		doc = frappe.get_doc("Employee Biometric Profile", profile.name)
-		for sample in doc.biometric_samples or []:
-			if not cint(sample.is_active) or not sample.encoding:
+		employee_row = employees.get(profile.employee) or frappe._dict()
+		for sample in samples_by_profile.get(profile.name, []):
+			if not sample.encoding:
 				continue
 			try:
 				values: List[float] = json.loads(sample.encoding)  # type: ignore[assignment]
@@ -143,33 +466,102 @@ def load_encoding_cache(force: bool = False) -> list[EncodingCandidate]:
 				continue
 			candidates.append(
 				EncodingCandidate(
-					employee=doc.employee,
-					profile=doc.name,
+					employee=profile.employee,
+					profile=profile.name,
 					sample=sample.sample_name or sample.name,
 					encoding=values,
+					branch=employee_row.branch or None,
+					department=employee_row.department or None,
 				)
 			)
 
-	cache.set_value(
-		CACHE_KEY,
-		json.dumps([candidate.__dict__ for candidate in candidates]),
-	)
 	return candidates
 
 
-def invalidate_encoding_cache() -> None:
-	frappe.cache().delete_value(CACHE_KEY)
+def invalidate_encoding_cache(revoked_profile: str | None = None) -> None:
+	"""Refresh the cached gallery after a profile, sample or employee change.
+
+	A revoked (rejected, pending or deleted) profile must stop matching at once, so its
+	entries are dropped from every cached partition right away. Everything else is
+	picked up by a deduplicated in-place rebuild queued after commit, while the current
+	partitions keep serving check-ins.
+	"""
+	if revoked_profile:
+		_rewrite_cached_partitions(
+			frappe.cache().hkeys(CACHE_KEY) or [], keep=lambda entry: entry["profile"] != revoked_profile
+		)
+		# The cache was changed ahead of the transaction; rebuild it if the change is undone.
+		frappe.db.after_rollback.add(request_gallery_rebuild)
+	frappe.db.after_commit.add(request_gallery_rebuild)
+
+
+def request_gallery_rebuild() -> None:
+	frappe.cache().set_value(GALLERY_VERSION_KEY, frappe.generate_hash(length=10))
+	frappe.enqueue(
+		"vulero_biometric_attendance.tasks.warm_encoding_cache",
+		queue="short",
+		job_id=REBUILD_JOB_ID,
+		deduplicate=True,
+	)
+
 
+def invalidate_encoding_cache_for_employee(doc: Document, method: str | None = None) -> None:
+	"""Employee hook: move the employee's samples to their new branch/department partitions.
 
-def assert_allowed_network(ip_address: str | None = None) -> None:
-	settings = get_settings()
-	if not settings.enabled:
+	The move happens right away so that, with fallback disabled, a transferred employee is
+	never missing from the partition their new kiosks search.
+	"""
+	if not (doc.has_value_changed("branch") or doc.has_value_changed("department")):
 		return
 
-	allowed_networks = settings.get_allowed_networks()
-	if not allowed_networks:
+	before = doc.get_doc_before_save() or frappe._dict()
+	old_keys = _get_employee_partition_keys(before.get("branch"), before.get("department"))
+	new_keys = _get_employee_partition_keys(doc.branch, doc.department)
+	candidates = _collect_candidates(employee=doc.name)
+	if not candidates:
 		return
 
+	if frappe.cache().hget(CACHE_KEY, GLOBAL_PARTITION) is not None:
+		_rewrite_cached_partitions(old_keys - new_keys, keep=lambda entry: entry["employee"] != doc.name)
+		_rewrite_cached_partitions(new_keys, keep=lambda entry: entry["employee"] != doc.name, add=candidates)
+		frappe.db.after_rollback.add(request_gallery_rebuild)
+	invalidate_encoding_cache()
+
+
+def _get_employee_partition_keys(branch: str | None, department: str | None) -> set[str]:
+	keys = set()
+	if branch:
+		keys.add(get_partition_key(branch=branch))
+	if department:
+		keys.add(get_partition_key(department=department))
+	return keys
+
+
+def _rewrite_cached_partitions(
+	keys: Iterable[str | bytes],
+	keep: Callable[[dict], bool],
+	add: Sequence[EncodingCandidate] = (),
+) -> None:
+	"""Filter (and optionally extend) cached partitions in place, skipping unchanged ones."""
+	cache = frappe.cache()
+	for key in keys:
+		key = frappe.safe_decode(key)
+		cached = cache.hget(CACHE_KEY, key)
+		entries = json.loads(cached) if cached is not None else []
+		kept = [entry for entry in entries if keep(entry)]
+		if len(kept) == len(entries) and not add:
+			continue
+		kept.extend(candidate.__dict__ for candidate in add)
+		cache.hset(CACHE_KEY, key, json.dumps(kept))
+
+
+def preload_face_models() -> None:
+	"""before_request hook: load dlib's models in each web worker before its first check-in."""
+	load_face_recognition()
+
+
+def get_request_ip(ip_address: str | None = None) -> str | None:
+	"""Resolve the client IP, preferring the reverse proxy's forwarding headers."""
 	ip = ip_address or getattr(frappe.local, "request_ip", None)
 	request = getattr(frappe.local, "request", None)
 
@@ -185,8 +577,23 @@ def assert_allowed_network(ip_address: str | None = None) -> None:
 		elif not ip:
 			ip = getattr(request, "remote_addr", None)
 
+	return ip
+
+
+def assert_allowed_network(ip_address: str | None = None) -> Document | None:
+	"""Reject requests from outside the allow-list and return the matching network row, if any."""
+	settings = get_settings()
+	if not settings.enabled:
+		return None
+
+	if not settings.allowed_networks:
+		return None
+
+	ip = get_request_ip(ip_address)
 	if not ip:
-		frappe.throw(_("Unable to determine your IP address. Please try again from the office network."))
+		_reject_network(
+			_("Unable to determine your IP address. Please try again from the office network."), ip
+		)
 
 	import ipaddress
 
@@ -198,16 +605,26 @@ def assert_allowed_network(ip_address: str | None = None) -> None:
 			ip = ip.split(":", 1)[0]
 			request_ip = ipaddress.ip_address(ip)
 		else:
-			frappe.throw(_("Unable to interpret IP address {0}." ).format(ip))
+			_reject_network(_("Unable to interpret IP address {0}.").format(ip), ip)
 
 	if request_ip.is_loopback:
-		return
+		return None
 
-	for network in allowed_networks:
+	for network in settings.allowed_networks:
 		try:
-			if request_ip in ipaddress.ip_network(network, strict=False):
-				return
+			if request_ip in ipaddress.ip_network(network.cidr, strict=False):
+				return network
 		except ValueError:
 			continue
 
-	frappe.throw(_("Biometric check-ins are restricted to the approved office network. Please connect to the office Wi-Fi."))
+	_reject_network(
+		_(
+			"Biometric check-ins are restricted to the approved office network. Please connect to the office Wi-Fi."
+		),
+		ip,
+	)
+
+
+def _reject_network(message: str, ip: str | None) -> None:
+	log_attempt("Network Rejected", source="assert_allowed_network", message=message, ip_address=ip)
+	frappe.throw(message)
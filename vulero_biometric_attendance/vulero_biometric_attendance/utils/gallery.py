@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Iterator
+
+import frappe
+import numpy as np
+
+from vulero_biometric_attendance.vulero_biometric_attendance.utils.biometric import (
+	ENCODING_SIZE,
+	EncodingGallery,
+	build_encoding_gallery,
+	invalidate_encoding_cache,
+	load_encoding_cache,
+	squared_distance_matrix,
+)
+
+# 1024 x 1024 float64 distances are 8 MiB per block, whatever the gallery size.
+DEFAULT_BLOCK_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class GalleryPair:
+	left: int
+	right: int
+	distance: float
+
+
+def load_gallery() -> EncodingGallery:
+	"""Stack the approved, active gallery once for the analysis helpers in this module."""
+	return build_encoding_gallery(load_encoding_cache())
+
+
+def get_employee_codes(gallery: EncodingGallery) -> np.ndarray:
+	"""Map each gallery row to a small integer per employee for vectorized comparisons."""
+	codes: dict[str, int] = {}
+	return np.fromiter(
+		(codes.setdefault(candidate.employee, len(codes)) for candidate in gallery.candidates),
+		dtype=np.int64,
+		count=len(gallery),
+	)
+
+
+def iter_distance_blocks(
+	gallery: EncodingGallery, block_size: int = DEFAULT_BLOCK_SIZE
+) -> Iterator[tuple[int, int, np.ndarray]]:
+	"""Yield ``(row_start, col_start, squared_distances)`` over the upper triangle of the gallery.
+
+	Only blocks with ``col_start >= row_start`` are produced, so each unordered pair is
+	covered once and no more than one block is held in memory at a time.
+	"""
+	size = len(gallery)
+	for row_start in range(0, size, block_size):
+		rows = gallery.matrix[row_start : row_start + block_size]
+		for col_start in range(row_start, size, block_size):
+			cols = slice(col_start, col_start + block_size)
+			yield (
+				row_start,
+				col_start,
+				squared_distance_matrix(rows, gallery.matrix[cols], gallery.squared_norms[cols]),
+			)
+
+
+def find_close_pairs(
+	gallery: EncodingGallery,
+	cross_employee_threshold: float,
+	same_employee_threshold: float,
+	block_size: int = DEFAULT_BLOCK_SIZE,
+	limit: int | None = None,
+) -> tuple[list[GalleryPair], list[GalleryPair]]:
+	"""Return ``(collisions, redundant)`` gallery pairs, closest first.
+
+	Collisions are samples of different employees within ``cross_employee_threshold`` of
+	each other; redundant pairs are samples of the same employee within
+	``same_employee_threshold``. ``limit`` caps each list to keep memory bounded on
+	pathological galleries.
+	"""
+	employees = get_employee_codes(gallery)
+	cross_limit = cross_employee_threshold**2
+	same_limit = same_employee_threshold**2
+
+	collisions = _PairCollector(limit)
+	redundant = _PairCollector(limit)
+	for row_start, col_start, squared in iter_distance_blocks(gallery, block_size):
+		if row_start == col_start:
+			# Drop the diagonal and the mirrored lower half of diagonal blocks.
+			squared[np.tril_indices(squared.shape[0], m=squared.shape[1])] = np.inf
+
+		rows, cols = np.nonzero(squared <= max(cross_limit, same_limit))
+		if not len(rows):
+			continue
+
+		distances = squared[rows, cols]
+		rows += row_start
+		cols += col_start
+		same = employees[rows] == employees[cols]
+
+		cross = ~same & (distances <= cross_limit)
+		collisions.add(rows[cross], cols[cross], distances[cross])
+		duplicate = same & (distances <= same_limit)
+		redundant.add(rows[duplicate], cols[duplicate], distances[duplicate])
+
+	return collisions.pairs(), redundant.pairs()
+
+
+class _PairCollector:
+	"""Accumulates (row, col, squared distance) hits, keeping at most ``limit`` closest."""
+
+	def __init__(self, limit: int | None = None) -> None:
+		self.limit = limit
+		self.rows = np.empty(0, dtype=np.int64)
+		self.cols = np.empty(0, dtype=np.int64)
+		self.squared = np.empty(0, dtype="float64")
+
+	def add(self, rows: np.ndarray, cols: np.ndarray, squared: np.ndarray) -> None:
+		if not len(rows):
+			return
+		self.rows = np.concatenate((self.rows, rows))
+		self.cols = np.concatenate((self.cols, cols))
+		self.squared = np.concatenate((self.squared, squared))
+		if self.limit and len(self.squared) > 2 * self.limit:
+			self._keep(np.argpartition(self.squared, self.limit)[: self.limit])
+
+	def pairs(self) -> list[GalleryPair]:
+		order = np.argsort(self.squared, kind="stable")
+		if self.limit:
+			order = order[: self.limit]
+		self._keep(order)
+		return [
+			GalleryPair(int(row), int(col), float(np.sqrt(squared)))
+			for row, col, squared in zip(self.rows, self.cols, self.squared, strict=True)
+		]
+
+	def _keep(self, indexes: np.ndarray) -> None:
+		self.rows = self.rows[indexes]
+		self.cols = self.cols[indexes]
+		self.squared = self.squared[indexes]
+
+
+def sample_genuine_distances(
+	gallery: EncodingGallery,
+	max_pairs: int,
+	rng: np.random.Generator,
+) -> np.ndarray:
+	"""Distances between samples of the same employee, subsampled to ``max_pairs``.
+
+	Every pair is used while there are at most ``max_pairs``. Beyond that, pairs are
+	drawn at random within each employee's samples instead of enumerated, since the
+	pair count grows with the square of the samples per employee.
+	"""
+	employees = get_employee_codes(gallery)
+	order = np.argsort(employees, kind="stable")
+	boundaries = np.flatnonzero(np.diff(employees[order])) + 1
+	groups = [group for group in np.split(order, boundaries) if len(group) > 1]
+	if not groups:
+		return np.empty(0, dtype="float64")
+
+	sizes = np.array([len(group) for group in groups], dtype="int64")
+	pair_counts = sizes * (sizes - 1) // 2
+	total_pairs = int(pair_counts.sum())
+	if total_pairs <= max_pairs:
+		left_parts: list[np.ndarray] = []
+		right_parts: list[np.ndarray] = []
+		for group in groups:
+			left, right = np.triu_indices(len(group), k=1)
+			left_parts.append(group[left])
+			right_parts.append(group[right])
+		return pair_distances(gallery.matrix, np.concatenate(left_parts), np.concatenate(right_parts))
+
+	# Pick each pair's employee in proportion to their pair count, then two distinct
+	# samples of that employee: every same-employee pair is equally likely.
+	members = np.concatenate(groups)
+	offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+	chosen = rng.choice(len(groups), size=max_pairs, p=pair_counts / total_pairs)
+	first = rng.integers(0, sizes[chosen])
+	second = rng.integers(0, sizes[chosen] - 1)
+	second += second >= first
+	return pair_distances(gallery.matrix, members[offsets[chosen] + first], members[offsets[chosen] + second])
+
+
+def sample_impostor_distances(
+	gallery: EncodingGallery,
+	max_pairs: int,
+	rng: np.random.Generator,
+) -> np.ndarray:
+	"""Distances between random samples of different employees, up to ``max_pairs``."""
+	employees = get_employee_codes(gallery)
+	size = len(gallery)
+	if size < 2 or len(np.unique(employees)) < 2:
+		return np.empty(0, dtype="float64")
+
+	left_parts: list[np.ndarray] = []
+	right_parts: list[np.ndarray] = []
+	collected = 0
+	# Uniform draws hit the same employee rarely, so a few rounds always suffice
+	# unless the gallery is dominated by one employee.
+	for _attempt in range(8):
+		draw = int((max_pairs - collected) * 1.25) + 16
+		left = rng.integers(0, size, size=draw)
+		right = rng.integers(0, size, size=draw)
+		keep = employees[left] != employees[right]
+		left_parts.append(left[keep])
+		right_parts.append(right[keep])
+		collected += int(keep.sum())
+		if collected >= max_pairs:
+			break
+
+	left = np.concatenate(left_parts)[:max_pairs]
+	right = np.concatenate(right_parts)[:max_pairs]
+	return pair_distances(gallery.matrix, left, right)
+
+
+def pair_distances(
+	matrix: np.ndarray,
+	left: np.ndarray,
+	right: np.ndarray,
+	chunk_size: int = 65536,
+) -> np.ndarray:
+	"""Euclidean distances for explicit row pairs, computed in fixed-size chunks."""
+	distances = np.empty(len(left), dtype="float64")
+	for start in range(0, len(left), chunk_size):
+		stop = start + chunk_size
+		distances[start:stop] = np.linalg.norm(matrix[left[start:stop]] - matrix[right[start:stop]], axis=1)
+	return distances
+
+
+def error_rate_curves(
+	genuine: np.ndarray,
+	impostor: np.ndarray,
+	thresholds: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+	"""Return ``(false_accept_rate, false_reject_rate)`` at each threshold.
+
+	A probe is accepted when its distance is at or below the threshold, matching
+	``match_encoding``.
+	"""
+	impostor = np.sort(impostor)
+	genuine = np.sort(genuine)
+	far = np.searchsorted(impostor, thresholds, side="right") / max(len(impostor), 1)
+	frr = 1.0 - np.searchsorted(genuine, thresholds, side="right") / max(len(genuine), 1)
+	if not len(genuine):
+		frr = np.zeros_like(thresholds, dtype="float64")
+	return far, frr
+
+
+def recommend_threshold(
+	thresholds: np.ndarray,
+	far: np.ndarray,
+	frr: np.ndarray,
+	target_far: float,
+) -> float:
+	"""Most permissive threshold whose false-accept rate stays within ``target_far``.
+
+	Falls back to the equal-error-rate point when no threshold meets the target.
+	"""
+	within_target = np.flatnonzero(far <= target_far)
+	if len(within_target):
+		return float(thresholds[within_target[-1]])
+	return float(thresholds[int(np.abs(far - frr).argmin())])
+
+
+def select_representative_samples(matrix: np.ndarray, count: int) -> list[int]:
+	"""Pick ``count`` rows that best cover the encodings in ``matrix``.
+
+	Starts from the medoid (the sample closest to all others) and then repeatedly adds
+	the sample farthest from everything picked so far, so the kept set spans the
+	lighting, angle and age variation of the enrollment history.
+	"""
+	size = len(matrix)
+	if size <= count:
+		return list(range(size))
+
+	distances = np.sqrt(squared_distance_matrix(matrix, matrix))
+	selected = [int(distances.sum(axis=1).argmin())]
+	nearest = distances[selected[0]].copy()
+	# Picked rows are excluded explicitly: with duplicate encodings every remaining
+	# distance can be 0, and argmax would return a row that is already kept.
+	nearest[selected[0]] = -np.inf
+	while len(selected) < count:
+		candidate = int(nearest.argmax())
+		selected.append(candidate)
+		np.minimum(nearest, distances[candidate], out=nearest)
+		nearest[candidate] = -np.inf
+
+	return sorted(selected)
+
+
+def compact_gallery(max_samples: int) -> int:
+	"""Keep at most ``max_samples`` active samples per profile; return how many were deactivated."""
+	if max_samples < 1:
+		return 0
+
+	oversized = frappe.get_all(
+		"Employee Biometric Sample",
+		filters={"parenttype": "Employee Biometric Profile", "is_active": 1},
+		fields=["parent", "count(name) as sample_count"],
+		group_by="parent",
+	)
+	deactivated = 0
+	for row in oversized:
+		if row.sample_count > max_samples:
+			deactivated += compact_profile_samples(row.parent, max_samples)
+
+	if deactivated:
+		invalidate_encoding_cache()
+	return deactivated
+
+
+def compact_profile_samples(profile: str, max_samples: int) -> int:
+	samples = frappe.get_all(
+		"Employee Biometric Sample",
+		filters={"parenttype": "Employee Biometric Profile", "parent": profile, "is_active": 1},
+		fields=["name", "encoding"],
+		order_by="idx asc",
+	)
+
+	names: list[str] = []
+	vectors: list[list[float]] = []
+	for sample in samples:
+		try:
+			values = json.loads(sample.encoding or "")
+		except json.JSONDecodeError:
+			continue
+		if len(values) == ENCODING_SIZE:
+			names.append(sample.name)
+			vectors.append(values)
+
+	if len(names) <= max_samples:
+		return 0
+
+	keep = set(select_representative_samples(np.array(vectors, dtype="float64"), max_samples))
+	to_deactivate = [name for index, name in enumerate(names) if index not in keep]
+	frappe.db.set_value(
+		"Employee Biometric Sample",
+		{"name": ["in", to_deactivate]},
+		"is_active",
+		0,
+		update_modified=False,
+	)
+	return len(to_deactivate)